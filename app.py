@@ -1,16 +1,31 @@
-from dash import Dash, html, dcc, callback, Output, Input
+from dash import Dash, DiskcacheManager, Patch, html, dcc, callback, ctx, no_update, Output, Input, State
+from dash.exceptions import PreventUpdate
 from dash_extensions.javascript import assign
+from flask import Response, abort, jsonify, request, send_file
+from flask_caching import Cache
 import dash_leaflet as dl
-import geopandas as gpd
-import plotly.express as px
-import pandas as pd
+import hashlib
+import json
 import os
+from functools import lru_cache, wraps
+from urllib.parse import urlencode
+
+from count_cube import CountCube
+from data_store import default_cache_dir, load_accidents, read_manifest
+from figures import message_figure, stacked_bar_figure
+import heatmap_tiles
+from selection import decode_selection, encode_selection, snap_bounds
+from startup_state import code_sha256, load_or_build_state, state_key
+from vector_tiles import MAX_ZOOM
 
 # Load data
 file_dir = os.path.dirname(__file__)
 
 # Processed data from https://data.gov.il/dataset/2023-puf
-df = pd.read_csv(os.path.join(file_dir, 'accidents_2023_processed.csv'))
+# Loaded through a columnar cache that is rebuilt when the CSV changes
+accidents_csv = os.path.join(file_dir, 'accidents_2023_processed.csv')
+df = load_accidents(accidents_csv)
+accidents_sha256 = read_manifest(default_cache_dir(accidents_csv))['source']['sha256']
 
 
 # Process Data
@@ -26,22 +41,92 @@ columns_for_graph.append('HODESH_TEUNA')
 labels_for_graph = non_numerical_labels.copy()
 labels_for_graph.append('Month')
 
-# Create dictionaries for unique values of each column
-col_unique_values_dict = {}
-labels_unique_values_dict = {}
-for col in non_numerical_columns:
-    col_unique_values_dict[col] = df[col].unique().tolist()
-    labels_unique_values_dict[cols_to_labels[col]
-                              ] = col_unique_values_dict[col]
+# Zoom level of the environmental map, which cannot be zoomed
+ENV_MAP_ZOOM = 8
+
+# Level of detail of the main map: below LOD_POINT_ZOOM, or above LOD_MAX_POINTS
+# accidents in view, the map shows grid cells of LOD_CELL_PIXELS pixels with their
+# counts instead of the accidents (see benchmarks/bench_lod.py)
+LOD_POINT_ZOOM = int(os.environ.get('LOD_POINT_ZOOM', 11))
+LOD_MAX_POINTS = int(os.environ.get('LOD_MAX_POINTS', 20_000))
+LOD_CELL_PIXELS = int(os.environ.get('LOD_CELL_PIXELS', 32))
+
+# The main map view reaches the server callbacks once it has been still for
+# VIEW_DEBOUNCE_MS, and the callbacks drop their work when a newer view of the
+# same browser tab arrived meanwhile (see benchmarks/bench_drag.py)
+VIEW_DEBOUNCE_MS = int(os.environ.get('VIEW_DEBOUNCE_MS', 250))
+
+# Properties sent with each point of the map
+point_properties = ['pk_teuna_fikt'] + list(cols_to_labels.keys())
+
+# Everything derived from the dataset is built once per dataset, code and settings,
+# and loaded by the next workers (see startup_state)
+state_params = {
+    'graph_columns': list(cols_to_labels.keys()), 'filter_columns': non_numerical_columns,
+    'point_properties': point_properties, 'palette_columns': columns_for_graph, 'palette_x_col': 'HODESH_TEUNA',
+    'env_map_zoom': ENV_MAP_ZOOM, 'lod_point_zoom': LOD_POINT_ZOOM, 'lod_cell_pixels': LOD_CELL_PIXELS,
+}
+state = load_or_build_state(df, default_cache_dir(accidents_csv), accidents_sha256, state_params)
+
+# Dictionaries of the unique values of each column
+col_unique_values_dict = state['col_unique_values_dict']
+labels_unique_values_dict = {cols_to_labels[col]: values for col, values in col_unique_values_dict.items()}
+
+# Bitmap index used to apply the checklist filters
+filter_index = state['filter_index']
+# Grid index used by the "Filter Map-view" bounds query
+spatial_index = state['spatial_index']
+# Accident counts over every graph dimension, used to build the graphs
+count_cube = state['count_cube']
+
+# Colors of the values of every graph column, as px.bar gives them over the months
+col_values_color = state['col_values_color']
 
+# Point clusters of the environmental map, built on the server
+env_clusters = state['env_clusters']
+# Grid cells of the main map when it is zoomed out
+lod_cells = state['lod_cells']
 
-monthly_accidents = df.groupby(
-    ['HODESH_TEUNA', 'HUMRAT_TEUNA']).size().reset_index(name='count')
 
-# Convert DataFrame to GeoDataFrame
-gdf = gpd.GeoDataFrame(df, geometry=gpd.points_from_xy(df.lon, df.lat))
-gdf['active_col'] = 'HUMRAT_TEUNA'
-points_geojson = gdf.__geo_interface__
+def select_rows(filter_values, map_bounds=None):
+    """
+    Select the accidents matching the checklist filters and, optionally, the map view.
+
+    Parameters
+    ----------
+    filter_values : dict
+        Maps each checklist column to the list of its selected values.
+    map_bounds : list, optional
+        Bounds of the main map, when the map-view filter is on.
+
+    Returns
+    -------
+    numpy.ndarray
+        Sorted positions of the selected rows in `df`.
+    """
+    bounds_rows = None if map_bounds is None else spatial_index.query(map_bounds)
+    return filter_index.select(filter_values, rows=bounds_rows)
+
+
+# Datasets up to this many rows are filtered in the browser: the full point set
+# is loaded once and the map layers filter it from their hideout.
+CLIENT_FILTER_MAX_ROWS = int(os.environ.get('CLIENT_FILTER_MAX_ROWS', 200_000))
+client_side_filtering = len(df) <= CLIENT_FILTER_MAX_ROWS
+
+# Every map point encoded once, sliced per selection by the points routes.
+# The map layers load the geobuf encoding, with coordinates quantized to ~0.1 m.
+point_features = state['point_features']
+point_geobuf = state['point_geobuf']
+# Vector tiles of the points, the accident id being the feature id
+point_tiles = state['point_tiles']
+# Number of encoded tiles kept in memory, over every filter selection
+TILE_CACHE_SIZE = int(os.environ.get('TILE_CACHE_SIZE', 4096))
+
+# Density heatmap tiles, one layer per severity, rendered with the state. Their URLs
+# carry the digest of the pyramid, so the browsers drop the tiles of an older one.
+heatmap_dir = os.path.join(default_cache_dir(accidents_csv), 'heatmap')
+heatmap_layers = col_unique_values_dict['HUMRAT_TEUNA']
+heatmap_version = heatmap_tiles.pyramid_digest(heatmap_dir)
 # JavaScript function to assign tooltip to each feature
 
 
@@ -50,7 +135,7 @@ def assign_on_each_feature():
     Creates a JavaScript function to bind a tooltip to each feature in a map layer.
 
     The tooltip displays the `HODESH_TEUNA` property and the value of the property
-    specified by `active_col` for each feature.
+    specified by `active_col` in the context's hideout for each feature.
 
     Returns
     -------
@@ -58,7 +143,7 @@ def assign_on_each_feature():
         A string containing the JavaScript function to be used for binding tooltips.
     """
     on_each_feature = assign("""function(feature, layer, context){
-        layer.bindTooltip(`${feature.properties.HODESH_TEUNA} (${feature.properties[feature.properties.active_col]})`)
+        layer.bindTooltip(`${feature.properties.HODESH_TEUNA} (${feature.properties[context.hideout.active_col]})`)
     }""")
     return on_each_feature
 
@@ -86,65 +171,107 @@ def assign_point_to_layer():
     return point_to_layer
 
 
-# Hide points that are out of the range in the search clsuter (env_map)
-point_to_layer_hide = assign("""function(feature, latlng, context){
-    circleOptions = {fillOpacity: 0, stroke: false, radius: 0};
-    return L.circleMarker(latlng, circleOptions);  // render a simple circle marker
+# JavaScript function to filter the points in the browser
+
+
+def assign_filter():
+    """
+    Creates a JavaScript function to filter the features of a map layer in the browser.
+
+    The function keeps the features whose properties are among the selected values of
+    every column in the context's hideout `filters`, and, if the hideout has `bounds`,
+    whose point is strictly inside them. Without `filters` (server-side filtering)
+    every feature is kept, and with `hide_points` (aggregated level of detail) none is.
+
+    Returns
+    -------
+    str
+        A string containing the JavaScript function to be used for filtering features.
+    """
+    feature_filter = assign("""function(feature, context){
+        const {filters, bounds, hide_points} = context.hideout;
+        if (hide_points) {
+            return false;
+        }
+        if (!filters) {
+            return true;
+        }
+        for (const col in filters) {
+            if (!filters[col].includes(feature.properties[col])) {
+                return false;
+            }
+        }
+        if (bounds) {
+            const [lon, lat] = feature.geometry.coordinates;
+            return lat > bounds[0][0] && lat < bounds[1][0] && lon > bounds[0][1] && lon < bounds[1][1];
+        }
+        return true;
+    }""")
+    return feature_filter
+
+
+# Style and tooltip of the grid cells shown instead of the points when zoomed out
+grid_cell_style = assign("""function(feature){
+    const color = feature.properties.color || '#636efa';
+    return {color: color, weight: 0.5, fillColor: color, fillOpacity: 0.6};
+}""")
+grid_cell_tooltip = assign("""function(feature, layer){
+    layer.bindTooltip(`${feature.properties.count} accidents (mostly ${feature.properties.value})`)
+}""")
+
+# Draw the server-side clusters of the environmental map like Leaflet's cluster bubbles
+cluster_to_layer = assign("""function(feature, latlng){
+    const count = feature.properties.point_count;
+    const size = count < 100 ? 'small' : count < 1000 ? 'medium' : 'large';
+    const label = count >= 10000 ? `${Math.round(count / 1000)}k` : count >= 1000 ? `${Math.round(count / 100) / 10}k` : count;
+    const icon = L.divIcon({html: `<div><span>${label}</span></div>`, className: `marker-cluster marker-cluster-${size}`,
+                            iconSize: L.point(40, 40)});
+    return L.marker(latlng, {icon: icon});
 }""")
 # Function to generate bar graph
 
 
 def graph_generator(df, x_col, color_stack_col, **kwargs):
     """
-    Generates a bar graph using Plotly based on the provided DataFrame.
+    Generates a stacked bar graph of the accident counts.
 
     Parameters
     ----------
-    df : pandas.DataFrame
-        The input DataFrame containing the data to be plotted.
+    df : pandas.DataFrame or None
+        The input DataFrame containing the data to be plotted. Not used when `counts` is given.
     x_col : str
         The column name in the DataFrame to be used for the x-axis.
     color_stack_col : str
         The column name in the DataFrame to be used for stacking colors in the bar graph.
+    counts : numpy.ndarray, optional
+        Precomputed counts over the `count_cube` categories of `x_col` and
+        `color_stack_col`, e.g. from `CountCube.matrix`.
+    col_values_color : dict, optional
+        Maps a column to the color of each of its values.
 
     Returns
     -------
-    plotly.graph_objs._figure.Figure
-        A Plotly Figure object representing the generated bar graph.
+    dict
+        The figure, as plotly.express would build it with ``px.bar``.
 
     Notes
     -----
-    - The function groups the DataFrame by `x_col` and `color_stack_col` and counts the occurrences.
+    - Unless `counts` is given, the function counts the occurrences of each (`x_col`, `color_stack_col`) pair in the DataFrame.
     - The x-axis and y-axis titles are updated based on the `cols_to_labels` dictionary.
     - The legend title is also updated based on the `cols_to_labels` dictionary.
     - The layout of the figure is customized to have no margins and a fixed height of 400.
     """
-    gb_df = df.groupby([x_col, color_stack_col]
-                       ).size().reset_index(name='count')
-    if 'col_values_color' in kwargs:
-        col_values_color_dict = kwargs['col_values_color']
-        fig = px.bar(gb_df, x=x_col, y='count', color=color_stack_col,
-                     color_discrete_map=col_values_color_dict[color_stack_col], template='plotly_white')
+    if 'counts' in kwargs:
+        cube, counts = count_cube, kwargs['counts']
     else:
-        fig = px.bar(gb_df, x=x_col, y='count',
-                     color=color_stack_col, template='plotly_white')
-
-    fig.update_layout(xaxis={'tickmode': 'linear'}, margin={
-                      'l': 0, 'r': 0, 't': 25, 'b': 25}, height=400)
-    fig.update_xaxes(title_text=cols_to_labels[x_col])
-    fig.update_yaxes(title_text='Number of Accidents')
-    fig.update_layout(legend_title_text=cols_to_labels[color_stack_col])
-    return fig
+        cube = CountCube(df, [x_col, color_stack_col])
+        counts = cube.matrix(x_col, color_stack_col)
+    color_map = kwargs.get('col_values_color', {}).get(color_stack_col)
+    return stacked_bar_figure(counts, cube.categories[x_col].tolist(), cube.categories[color_stack_col].tolist(),
+                              x_col, color_stack_col, cols_to_labels[x_col], cols_to_labels[color_stack_col],
+                              color_map)
 
 
-# Initialize color dictionary for graphs
-col_values_color = {}
-for col in columns_for_graph:
-    if col != 'HODESH_TEUNA':
-        fig = graph_generator(df, x_col='HODESH_TEUNA', color_stack_col=col)
-        col_values_color[col] = {
-            item['name']: item['marker']['color'] for item in fig.to_dict()['data']}
-
 # Function to generate an empty graph with a message
 
 
@@ -152,40 +279,16 @@ def empty_graph():
     """
     Create an empty scatter plot with an annotation.
 
-    This function generates an empty scatter plot using Plotly Express and adds an annotation
-    in the center of the plot indicating that a graph cannot be produced. The plot has no visible
-    axes and a transparent background.
+    The annotation, in the center of the plot, indicates that a graph cannot be
+    produced. The plot has no visible axes and a transparent background.
 
     Returns
     -------
-    plotly.graph_objs._figure.Figure
-        A Plotly Figure object representing the empty scatter plot with the annotation.
-    """
-    fig = px.scatter()
-    fig.add_annotation(
-        text="Cannot produce a graph",
-        xref="paper", yref="paper",
-        x=0.5, y=0.5, showarrow=False,
-        font={'size': 20, 'color': "red"}
-    )
-    fig.update_layout(
-        xaxis={'visible': False},
-        yaxis={'visible': False},
-        plot_bgcolor='rgba(0,0,0,0)',
-        paper_bgcolor='rgba(0,0,0,0)',
-        margin={'l': 0, 'r': 0, 't': 40, 'b': 0},
-        height=300
-    )
-    return fig
-
-
-# Initialize color-discrete-map for graphs
-col_values_color = {}
-for col in columns_for_graph:
-    if col != 'HODESH_TEUNA':
-        fig = graph_generator(df, x_col='HODESH_TEUNA', color_stack_col=col)
-        col_values_color[col] = {
-            item['name']: item['marker']['color'] for item in fig.to_dict()['data']}
+    dict
+        The figure of the empty scatter plot with the annotation, see
+        `figures.message_figure`.
+    """
+    return message_figure("Cannot produce a graph")
 
 
 fig = graph_generator(df, x_col='HODESH_TEUNA',
@@ -194,20 +297,119 @@ fig = graph_generator(df, x_col='HODESH_TEUNA',
 hide_out_dict = {
     'active_col': 'HUMRAT_TEUNA',
     'circleOptions': {'fillOpacity': 1, 'stroke': False, 'radius': 3.5},
-    'color_dict': col_values_color
+    'color_dict': col_values_color,
+    'filters': None,  # set when filtering in the browser
+    'bounds': None,
+    'hide_points': False  # set when the map shows grid cells
 }
+# Opt-in: run the heavy callbacks in background processes, so that a slow
+# selection does not hold a server thread. Needs `pip install "dash[diskcache]"`.
+# The jobs run in forked processes, which only share the callback cache, and the
+# stale-view records and the /cache-stats counters kept in it, through a cache
+# outside of the memory of the server process: in this mode the default
+# SimpleCache is replaced with a FileSystemCache (see `cache`).
+BACKGROUND_CALLBACKS = os.environ.get('BACKGROUND_CALLBACKS', '') == '1'
+background_callback_manager = None
+if BACKGROUND_CALLBACKS:
+    import diskcache
+    background_callback_manager = DiskcacheManager(
+        diskcache.Cache(os.path.join(default_cache_dir(accidents_csv), 'background')), expire=600)
+
+app = Dash(background_callback_manager=background_callback_manager)
+server = app.server # Needed for render.com
+
+# Cache of the callback results, shared by the workers with CACHE_TYPE=FileSystemCache.
+# Above CACHE_THRESHOLD entries (a number of results, whatever their size) the cache
+# drops the expired ones, then the oldest ones. Results expire after CACHE_TIMEOUT seconds.
+CACHE_TYPE = os.environ.get('CACHE_TYPE', 'SimpleCache')
+if BACKGROUND_CALLBACKS and CACHE_TYPE == 'SimpleCache':
+    # A SimpleCache lives in the memory of one process, out of reach of the background jobs
+    CACHE_TYPE = 'FileSystemCache'
+# The results depend on the dataset, on the state built from it and on the code
+# and settings of the callbacks: the keys of a FileSystemCache, which outlives the
+# server, change with any of them
+cache_version = hashlib.sha256(json.dumps({
+    'state': state_key(accidents_sha256, state_params), 'code': code_sha256(['app', 'figures', 'selection']),
+    'lod_max_points': LOD_MAX_POINTS,
+}).encode()).hexdigest()[:16]
+cache = Cache(server, config={
+    'CACHE_TYPE': CACHE_TYPE,
+    'CACHE_DIR': os.environ.get('CACHE_DIR', os.path.join(default_cache_dir(accidents_csv), 'callbacks')),
+    'CACHE_THRESHOLD': int(os.environ.get('CACHE_THRESHOLD', 500)),
+    'CACHE_DEFAULT_TIMEOUT': int(os.environ.get('CACHE_TIMEOUT', 24 * 3600)),
+    'CACHE_KEY_PREFIX': f'accidents-{cache_version}-',
+})
+# Cache hits and misses of this process
+cache_stats = {'hits': 0, 'misses': 0}
+# Callbacks of this process dropped for a newer view of the main map
+view_stats = {'stale': 0}
+# Background jobs run in forked processes, whose counters the server never sees:
+# in that mode the counters are kept in the cache instead, over every process
+SHARED_STATS = BACKGROUND_CALLBACKS
+# Seconds the latest view of a browser tab is remembered
+VIEW_SESSION_TIMEOUT = 3600
+
+
+def count_event(stats, name):
+    """Count an event of `stats`, in the cache with SHARED_STATS."""
+    if not SHARED_STATS:
+        stats[name] += 1
+        return
+    # Not atomic: two processes counting at once may lose an event
+    key = f'stats:{name}'
+    cache.set(key, (cache.get(key) or 0) + 1, timeout=0)
+
+
+def read_stats(stats):
+    """Read the counters of `stats`, from the cache with SHARED_STATS."""
+    if not SHARED_STATS:
+        return dict(stats)
+    return {name: cache.get(f'stats:{name}') or 0 for name in stats}
+
+
+def points_url(filter_values, map_bounds):
+    """
+    Build the URL the map layers load their points from.
+
+    Parameters
+    ----------
+    filter_values : dict
+        Maps each checklist column to the list of its selected values.
+    map_bounds : list or None
+        Bounds of the main map, when the map-view filter is on.
+
+    Returns
+    -------
+    str
+        URL of the `serve_points_geobuf` route for this selection.
+    """
+    key = encode_selection(filter_values, col_unique_values_dict, map_bounds)
+    return app.get_relative_path('/points.geobuf') + '?' + urlencode({'key': key})
+
+
+initial_points_url = points_url(col_unique_values_dict, None)
+
 # Main map Componenet
 dah_main_map = dl.Map([
     dl.TileLayer(
         url='https://{s}.basemaps.cartocdn.com/light_all/{z}/{x}/{y}{r}.png'),
     dl.GeoJSON(
-        id='points_geojson', data=points_geojson,
+        id='points_geojson', format='geobuf',
         pointToLayer=assign_point_to_layer(),  # how to draw points
         onEachFeature=assign_on_each_feature(),  # add (custom) tooltip
+        filter=assign_filter(),  # browser-side filtering
         hideout=hide_out_dict,
     ),
+    dl.GeoJSON(id='cells_geojson', style=grid_cell_style, onEachFeature=grid_cell_tooltip),  # zoomed-out level of detail
     dl.LocateControl(
-        locateOptions={'enableHighAccuracy': True})
+        locateOptions={'enableHighAccuracy': True}),
+    dl.LayersControl([
+        dl.Overlay(dl.TileLayer(
+            url=app.get_relative_path(f'/heatmap/{i}/') + '{z}/{x}/{y}.png?' + urlencode({'v': heatmap_version}),
+            minNativeZoom=min(heatmap_tiles.DEFAULT_ZOOMS), maxNativeZoom=max(heatmap_tiles.DEFAULT_ZOOMS)),
+            name=f'Density: {value}', checked=False)
+        for i, value in enumerate(heatmap_layers)
+    ], position='topright')
 ],
     center=[32, 34.9],
     zoom=12,
@@ -224,15 +426,14 @@ dah_main_map = dl.Map([
 dash_env_map = dl.Map([
     dl.TileLayer(
         url='https://{s}.basemaps.cartocdn.com/light_all/{z}/{x}/{y}{r}.png'),
-    dl.GeoJSON(id='points_env_geojson', data=points_geojson, cluster=True, superClusterOptions={
-               'radius': 125}, pointToLayer=point_to_layer_hide),  # hide remaining  points
+    dl.GeoJSON(id='points_env_geojson', pointToLayer=cluster_to_layer),  # clustered on the server
 
     dl.Polygon(positions=[], id='env_map_bb_polygon',
                color='red', fillOpacity=0)
 
 ],
     center=[32, 34.9],
-    zoom=8,
+    zoom=ENV_MAP_ZOOM,
     style={'height': '37vh'},
     id='env_map',
     dragging=False,
@@ -242,13 +443,6 @@ dash_env_map = dl.Map([
     boxZoom=False,
 )
 
-# Function to generate bounding box from bounds
-
-
-def generate_bounds(b): return [[b[0][0], b[0][1]], [b[1][0], b[0][1]], [
-    b[1][0], b[1][1]], [b[0][0], b[1][1]]]
-
-
 # Populate filter divs
 list_filter_divs = []
 for i, title in enumerate(non_numerical_labels):
@@ -258,10 +452,9 @@ for i, title in enumerate(non_numerical_labels):
     ]), className="div-card", style={'flex': '1', 'textAlign': 'left'})
     list_filter_divs.append(new_filter_div)
 
-app = Dash()
-server = app.server # Needed for render.com
-
 cell_style = {'padding': '10px', 'text-align': 'center'}
+# Progress bars of the background callbacks, only shown while they run
+progress_style = {'display': 'none', 'width': '100%'}
 # Set the layout right the first time!
 app.layout = html.Div(
     style={
@@ -292,14 +485,16 @@ app.layout = html.Div(
             list_filter_divs,
             style={'display': 'flex', 'gridColumn': 'span 2', 'height': '250px'}),
         # Main Map Div
-        html.Div(html.Div(
-            dah_main_map
-        ), className="div-card", style={'gridColumn': 'span 2', 'gridRow': 'span 2'}),
+        html.Div(html.Div([
+            dah_main_map,
+            html.Progress(id='map_progress', style=progress_style)
+        ]), className="div-card", style={'gridColumn': 'span 2', 'gridRow': 'span 2'}),
         # Contextual Graph Div
 
         html.Div([html.Div(
             [
                 dcc.Graph(figure=fig, id='contextual_graph'),
+                html.Progress(id='graph_progress', style=progress_style),
                 html.Div(
                     [
                         html.Div(html.Div([
@@ -318,14 +513,284 @@ app.layout = html.Div(
         ),
             html.Div(html.Div(dash_env_map, className="div-card",
                      style={'verticalAlign': 'top'}))
-        ],  style={'height': '100%'})
+        ],  style={'height': '100%'}),
+        # URL of the current point selection, loaded by the main map
+        dcc.Store(id='points_url_store', data=initial_points_url),
+        # Debounced view of the main map, read by the server callbacks
+        dcc.Store(id='map_view_store'),
+        # Structure of the contextual graph shown, see `figure_structure`
+        dcc.Store(id='graph_structure_store')
     ]
 )
 
 
 # Callback to update the contextual graph and map based on user inputs
+def contextual_graph(x_axis, color_stack, filter_values, view_bounds):
+    """
+    Build the contextual graph of a selection.
+
+    Parameters
+    ----------
+    x_axis : str
+        The label of the x-axis column.
+    color_stack : str
+        The label of the color stack column.
+    filter_values : dict
+        Maps each checklist column to the list of its selected values.
+    view_bounds : list or None
+        The bounds of the main map, when the map-view filter is on.
+
+    Returns
+    -------
+    dict or plotly.graph_objs._figure.Figure
+        The figure of the contextual graph.
+    """
+    if x_axis == color_stack:
+        return empty_graph()
+    x_col, color_stack_col = labels_to_cols[x_axis], labels_to_cols[color_stack]
+    # Without the map-view filter the counts come straight from the cube
+    if view_bounds is None:
+        counts = count_cube.matrix(x_col, color_stack_col, filter_values)
+    else:
+        counts = count_cube.rows_matrix(x_col, color_stack_col, select_rows(filter_values, view_bounds))
+    return graph_generator(
+        None, x_col=x_col, color_stack_col=color_stack_col, counts=counts, col_values_color=col_values_color)
+
+
+def figure_structure(x_axis, color_stack, fig):
+    """
+    Summarize the structure of a contextual graph: its dropdowns, traces and x categories.
+
+    Two figures of the same structure only differ by their y arrays, so one can
+    be turned into the other with a `dash.Patch` of them.
+
+    Parameters
+    ----------
+    x_axis : str
+        The label of the x-axis column.
+    color_stack : str
+        The label of the color stack column.
+    fig : dict
+        The figure, as built by `contextual_graph`.
+
+    Returns
+    -------
+    str
+        A digest of the dropdowns and of the name and x array of every trace.
+    """
+    traces = [[trace.get('name'), trace.get('x')] for trace in fig['data']]
+    return hashlib.sha256(json.dumps([x_axis, color_stack, traces]).encode()).hexdigest()[:16]
+
+
+def read_selection(filter_values_lists, filter_bounds, map_view):
+    """
+    Read the selection of the checklists and of the main map.
+
+    Parameters
+    ----------
+    filter_values_lists : list of list
+        The values selected in each filter checklist, in the order of
+        `non_numerical_columns`.
+    filter_bounds : list or None
+        The value of the map-view filter checklist.
+    map_view : dict or None
+        The view of the main map, with its ``bounds`` and ``zoom``.
+
+    Returns
+    -------
+    filter_values : dict
+        Maps each checklist column to the list of its selected values.
+    view_bounds : list or None
+        The snapped bounds of the main map, when the map-view filter is on.
+    map_bounds : list or None
+        The bounds of the main map, snapped to a grid of 64 px (see `snap_bounds`).
+    map_zoom : int or None
+        The zoom level of the main map.
+    """
+    map_bounds, map_zoom = (map_view or {}).get('bounds'), (map_view or {}).get('zoom')
+    if map_zoom is not None:
+        map_zoom = int(map_zoom)
+        if map_bounds is not None:
+            map_bounds = snap_bounds(map_bounds, map_zoom)
+    view_bounds = None
+    if (filter_bounds not in [None, []]) and (map_bounds is not None):
+        view_bounds = map_bounds
+    return dict(zip(non_numerical_columns, filter_values_lists)), view_bounds, map_bounds, map_zoom
+
+
+def claim_view(map_view, callback):
+    """
+    Check that a main map view is the latest a callback saw in its browser tab, recording it otherwise.
+
+    Parameters
+    ----------
+    map_view : dict or None
+        The view, with the ``session`` id of its tab and its ``seq`` number,
+        increasing with every move of the map.
+    callback : str
+        Name of the callback. Every callback keeps its own record, so that a
+        view seen by one callback never drops an update of another.
+
+    Raises
+    ------
+    dash.exceptions.PreventUpdate
+        If a newer view of the same tab reached the callback, which then
+        updates the outputs instead.
+    """
+    if not map_view or 'session' not in map_view:
+        return
+    key = f"view:{map_view['session']}:{callback}"
+    latest = cache.get(key)
+    if latest is not None and latest > map_view['seq']:
+        count_event(view_stats, 'stale')
+        raise PreventUpdate
+    if latest != map_view['seq']:
+        cache.set(key, map_view['seq'], timeout=VIEW_SESSION_TIMEOUT)
+
+
+def show_grid_cells(filter_values, view_bounds, map_bounds, map_zoom):
+    """
+    Decide whether the main map shows grid cells instead of the points of a selection.
+
+    Parameters
+    ----------
+    filter_values : dict
+        Maps each checklist column to the list of its selected values.
+    view_bounds : list or None
+        The bounds of the main map, when the map-view filter is on.
+    map_bounds : list or None
+        The bounds of the main map.
+    map_zoom : int or None
+        The zoom level of the main map.
+
+    Returns
+    -------
+    bool
+        True when the map is zoomed out or shows too many accidents.
+    """
+    if map_bounds is None or map_zoom is None:
+        return False
+    if map_zoom < LOD_POINT_ZOOM:
+        return True
+    view_rows = select_rows(filter_values, view_bounds or map_bounds)
+    return len(view_rows) > LOD_MAX_POINTS
+
+
+def grid_cells(active_col, filter_values, view_bounds, map_bounds, map_zoom):
+    """
+    Build the grid cells shown on the main map instead of the points.
+
+    Parameters
+    ----------
+    active_col : str
+        The color stack column, coloring the grid cells.
+    filter_values : dict
+        Maps each checklist column to the list of its selected values.
+    view_bounds : list or None
+        The bounds of the main map, when the map-view filter is on.
+    map_bounds : list
+        The bounds of the main map.
+    map_zoom : int
+        The zoom level of the main map.
+
+    Returns
+    -------
+    dict
+        The cells of the view, as a GeoJSON FeatureCollection.
+    """
+    # Counted from the precomputed cells when the zoom level has them
+    view_rows = None
+    if view_bounds is not None or map_zoom not in lod_cells.cells:
+        view_rows = select_rows(filter_values, view_bounds or map_bounds)
+    return lod_cells.grid_feature_collection(map_zoom, active_col, col_values_color.get(active_col, {}),
+                                             filter_values, view_rows, map_bounds)
+
+
+def cached(kind, canonical_key, compute):
+    """
+    Return the cached result of a computation, computing and caching it on a miss.
+
+    Parameters
+    ----------
+    kind : str
+        Prefix of the cache key, naming the computation.
+    canonical_key : str
+        A string identifying the inputs of the computation.
+    compute : callable
+        Computes the result from scratch.
+
+    Returns
+    -------
+    object
+        The result.
+    """
+    key = f'{kind}:' + hashlib.sha1(canonical_key.encode()).hexdigest()
+    value = cache.get(key)
+    if value is None:
+        count_event(cache_stats, 'misses')
+        value = compute()
+        cache.set(key, value)
+    else:
+        count_event(cache_stats, 'hits')
+    return value
+
+
+# The checklists, the map-view filter and the main map view, shared by the callbacks below
+selection_inputs = [Input(f'filter_{i + 1}_checklist', 'value') for i in range(len(non_numerical_columns))] + [
+    Input('filter_map_view', 'value'), Input('map_view_store', 'data')]
+# Sets the progress bar of the running background callback, see `heavy_callback`.
+# Every background callback runs in its own process, which has its own setter.
+progress_setter = None
+
+
+def report_progress(step, steps):
+    """Show that a background callback is at `step` of `steps`; does nothing in the foreground."""
+    if progress_setter is not None:
+        progress_setter((str(step), str(steps)))
+
+
+def heavy_callback(*dependencies, progress_bar):
+    """
+    Register a callback, run in the background with BACKGROUND_CALLBACKS.
+
+    Parameters
+    ----------
+    *dependencies : dash.Output, dash.Input or dash.State
+        The dependencies of the callback, as for `app.callback`.
+    progress_bar : str
+        Id of the progress bar shown while the callback runs in the background,
+        set with `report_progress`.
+
+    Returns
+    -------
+    callable
+        The decorator registering the callback.
+
+    Notes
+    -----
+    A background job is cancelled when the selection changes while it runs, and
+    the callback runs again for the new selection.
+    """
+    def register(func):
+        if background_callback_manager is None:
+            return app.callback(*dependencies)(func)
+
+        @wraps(func)
+        def run_in_background(set_progress, *args):
+            global progress_setter
+            progress_setter = set_progress
+            return func(*args)
+        return app.callback(
+            *dependencies, background=True,
+            progress=[Output(progress_bar, 'value'), Output(progress_bar, 'max')], progress_default=['0', '1'],
+            running=[(Output(progress_bar, 'style'), dict(progress_style, display='block'), progress_style)],
+            cancel=selection_inputs,
+        )(run_in_background)
+    return register
+
+
 """
-Update the contextual graph and map based on the provided filters and map bounds.
+Update the contextual graph based on the dropdowns, the filters and the map bounds.
 
 Parameters
 ----------
@@ -333,110 +798,400 @@ x_axis : str
     The value selected in the x-axis dropdown.
 color_stack : str
     The value selected in the color stack dropdown.
-filter_1_values : list
-    The values selected in the first filter checklist.
-filter_2_values : list
-    The values selected in the second filter checklist.
-filter_3_values : list
-    The values selected in the third filter checklist.
-filter_4_values : list
-    The values selected in the fourth filter checklist.
-filter_5_values : list
-    The values selected in the fifth filter checklist.
-filter_6_values : list
-    The values selected in the sixth filter checklist.
-filter_boudns : list
+filter_1_values, ..., filter_6_values : list
+    The values selected in the filter checklists.
+filter_bounds : list
     The value selected in the filter map view.
-map_bounds : list
-    The bounds of the main map.
-hideout : dict
-    The hideout data from the lines_geojson.
+map_view : dict
+    The debounced view of the main map, see `read_selection`.
+shown_structure : str or None
+    The structure of the graph shown, see `figure_structure`.
 
 Returns
 -------
-fig : plotly.graph_objs._figure.Figure
-    The updated figure for the contextual graph.
-points_geojson : dict
-    The GeoJSON data for the points to be displayed on the map.
-points_geojson : dict
-    The GeoJSON data for the environmental map.
-hideout : dict
-    The updated hideout parameters.
+fig : dict or dash.Patch
+    The updated figure for the contextual graph, or the patch of its y arrays.
+structure : str
+    The structure of the figure sent, only updated with a full figure.
+
+Notes
+-----
+The map view only matters with the map-view filter on: otherwise a pan or zoom
+leaves the graph as it is. With the filter on, the update is dropped when a
+newer view of the main map reached this callback meanwhile (see `claim_view`).
+The graph is cached under the canonical key of the selection. When it has the
+structure of the graph shown, its traces and x categories, it is sent as a
+`dash.Patch` of the trace y arrays. The structure
+shown is the one of the last figure that reached the browser, so a figure
+dropped on the way is sent again in full.
 """
 
 
-@app.callback(
+@heavy_callback(
     Output('contextual_graph', 'figure'),
-    Output('points_geojson', 'data'),
-    Output('points_env_geojson', 'data'),
-    Output('points_geojson', 'hideout'),
+    Output('graph_structure_store', 'data'),
     Input('x_axis_dropdown', 'value'),
     Input('color_stack_dropdown', 'value'),
-    Input('filter_1_checklist', 'value'),
-    Input('filter_2_checklist', 'value'),
-    Input('filter_3_checklist', 'value'),
-    Input('filter_4_checklist', 'value'),
-    Input('filter_5_checklist', 'value'),
-    Input('filter_6_checklist', 'value'),
-    Input('filter_map_view', 'value'),
-    Input('main_map', 'bounds'),
-    Input('points_geojson', 'hideout'),
+    *selection_inputs,
+    State('graph_structure_store', 'data'),
+    progress_bar='graph_progress',
 )
-def update_contextual_graph_map(x_axis, color_stack, filter_1_values, filter_2_values, filter_3_values, filter_4_values, filter_5_values, filter_6_values, filter_boudns, map_bounds, hideout):
-    df_filtered = df.copy()
-    if (filter_boudns not in [None, []]) and (map_bounds is not None):
-        ll, ur = map_bounds
-        y_ll, x_ll = ll
-        y_ur, x_ur = ur
-        df_filtered = df_filtered[(df_filtered['lat'] > y_ll) & (df_filtered['lat'] < y_ur) & (
-            df_filtered['lon'] > x_ll) & (df_filtered['lon'] < x_ur)]
-    filter_q = []
-    for i in range(len(non_numerical_labels)):
-        filter_col = labels_to_cols[non_numerical_labels[i]]
-        filter_values = eval(f'filter_{i+1}_values')
-        if i == 0:
-            filter_q = df_filtered[filter_col].isin(filter_values).values
-        else:
-            filter_q = filter_q & df_filtered[filter_col].isin(
-                filter_values).values
-    df_filtered = df_filtered[filter_q]
-    gdf_copy = gdf.loc[gdf['pk_teuna_fikt'].isin(
-        df_filtered['pk_teuna_fikt'])].copy()
-    gdf_copy['active_col'] = labels_to_cols[color_stack]
-    points_geojson = gdf_copy.__geo_interface__
-    hideout['active_col'] = labels_to_cols[color_stack]
-    if x_axis != color_stack:
-        fig = graph_generator(
-            df_filtered, x_col=labels_to_cols[x_axis], color_stack_col=labels_to_cols[color_stack], col_values_color=col_values_color)
-    else:
-        fig = empty_graph()
-    return fig, points_geojson, points_geojson, hideout
+def update_contextual_graph(x_axis, color_stack, filter_1_values, filter_2_values, filter_3_values, filter_4_values, filter_5_values, filter_6_values, filter_bounds, map_view, shown_structure):
+    if ctx.triggered_id == 'map_view_store' and filter_bounds in [None, []]:
+        return no_update, no_update
+    # Without the map-view filter the graph does not depend on the view
+    view = map_view if filter_bounds not in [None, []] else None
+    claim_view(view, 'graph')
+    filter_values, view_bounds, _, _ = read_selection([
+        filter_1_values, filter_2_values, filter_3_values, filter_4_values, filter_5_values, filter_6_values],
+        filter_bounds, map_view)
+    selection_key = encode_selection(filter_values, col_unique_values_dict, view_bounds)
+    report_progress(0, 1)
+    fig = cached('graph', f'{x_axis}|{color_stack}|{selection_key}',
+                 lambda: contextual_graph(x_axis, color_stack, filter_values, view_bounds))
+    claim_view(view, 'graph')
+    report_progress(1, 1)
+    structure = figure_structure(x_axis, color_stack, fig)
+    if structure != shown_structure:
+        return fig, structure
+    # Same traces and x categories as the graph shown: only their y arrays change
+    if x_axis == color_stack:
+        return no_update, no_update
+    patch = Patch()
+    for i, trace in enumerate(fig['data']):
+        patch['data'][i]['y'] = trace['y']
+    return patch, no_update
 
 
 """
-Updates the positions of the bounding box polygon on the environmental map.
+Update the point clusters of the environmental map based on the filters.
 
 Parameters
 ----------
-bounds : list of list of float
-    The bounds of the main map in the format [[southwest_lat, southwest_lng], [northeast_lat, northeast_lng]].
+filter_1_values, ..., filter_6_values : list
+    The values selected in the filter checklists.
+filter_bounds : list
+    The value selected in the filter map view.
+map_view : dict
+    The debounced view of the main map, see `read_selection`.
 
 Returns
 -------
-list of list of float
-    The positions of the bounding box polygon in the format [[lat1, lng1], [lat2, lng2], [lat3, lng3], [lat4, lng4]].
-    If bounds is None, returns an empty list.
+dict
+    The point clusters of the environmental map, as a GeoJSON FeatureCollection.
+
+Notes
+-----
+The map view only matters with the map-view filter on. With the filter on, the
+update is dropped when a newer view of the main map reached this callback
+meanwhile (see `claim_view`).
 """
 
 
 @app.callback(
+    Output('points_env_geojson', 'data'),
+    *selection_inputs,
+)
+def update_env_map(filter_1_values, filter_2_values, filter_3_values, filter_4_values, filter_5_values, filter_6_values, filter_bounds, map_view):
+    if ctx.triggered_id == 'map_view_store' and filter_bounds in [None, []]:
+        return no_update
+    # Without the map-view filter the clusters do not depend on the view
+    view = map_view if filter_bounds not in [None, []] else None
+    claim_view(view, 'env')
+    filter_values, view_bounds, _, _ = read_selection([
+        filter_1_values, filter_2_values, filter_3_values, filter_4_values, filter_5_values, filter_6_values],
+        filter_bounds, map_view)
+    rows = None if view_bounds is None else select_rows(filter_values, view_bounds)
+    env_data = cached('env', encode_selection(filter_values, col_unique_values_dict, view_bounds),
+                      lambda: env_clusters.feature_collection(ENV_MAP_ZOOM, filter_values, rows))
+    claim_view(view, 'env')
+    return env_data
+
+
+"""
+Update the layers of the main map based on the color stack, the filters and the map view.
+
+Parameters
+----------
+color_stack : str
+    The value selected in the color stack dropdown.
+filter_1_values, ..., filter_6_values : list
+    The values selected in the filter checklists.
+filter_bounds : list
+    The value selected in the filter map view.
+map_view : dict
+    The debounced view of the main map, see `read_selection`.
+hideout : dict
+    The current hideout of the points layer.
+current_url : str
+    The URL the points layer was last loaded from.
+
+Returns
+-------
+points_url : str
+    The URL of the points to be displayed on the main map, only updated when
+    the selection of points changes. With client-side filtering the full point
+    set is loaded once, and this is not updated.
+hideout : dash.Patch
+    The hideout parameters that changed.
+cells : dict
+    The grid cells shown on the main map instead of the points when it is zoomed out
+    or shows too many accidents, as a GeoJSON FeatureCollection, empty otherwise.
+
+Notes
+-----
+The hideout and the URL are read as states, and only sent back when they
+change, so that the points layer is neither refiltered nor reloaded for
+nothing. A color stack change only recolors the points, and the grid cells
+when they are shown. The update is dropped when a newer view of the main map
+arrived meanwhile (see `claim_view`).
+"""
+
+
+@heavy_callback(
+    Output('points_url_store', 'data'),
+    Output('points_geojson', 'hideout'),
+    Output('cells_geojson', 'data'),
+    Input('color_stack_dropdown', 'value'),
+    *selection_inputs,
+    State('points_geojson', 'hideout'),
+    State('points_url_store', 'data'),
+    progress_bar='map_progress',
+)
+def update_main_map(color_stack, filter_1_values, filter_2_values, filter_3_values, filter_4_values, filter_5_values, filter_6_values, filter_bounds, map_view, hideout, current_url):
+    claim_view(map_view, 'main_map')
+    filter_values, view_bounds, map_bounds, map_zoom = read_selection([
+        filter_1_values, filter_2_values, filter_3_values, filter_4_values, filter_5_values, filter_6_values],
+        filter_bounds, map_view)
+    selection_key = encode_selection(filter_values, col_unique_values_dict, view_bounds)
+    active_col = labels_to_cols[color_stack]
+    report_progress(0, 3)
+    show_cells = cached('lod', f'{selection_key}|{map_zoom}|{map_bounds}',
+                        lambda: show_grid_cells(filter_values, view_bounds, map_bounds, map_zoom))
+    report_progress(1, 3)
+
+    cells = no_update
+    if show_cells:
+        cells = cached('cells', f'{active_col}|{selection_key}|{map_zoom}|{map_bounds}',
+                       lambda: grid_cells(active_col, filter_values, view_bounds, map_bounds, map_zoom))
+    elif hideout['hide_points'] or ctx.triggered_id is None:
+        cells = {'type': 'FeatureCollection', 'features': []}
+    claim_view(map_view, 'main_map')
+    report_progress(2, 3)
+
+    changes = {'active_col': active_col, 'hide_points': show_cells}
+    url = no_update
+    if client_side_filtering:
+        # The full point set is already loaded, the map layers filter it
+        changes.update(filters=filter_values, bounds=view_bounds)
+    elif not show_cells:  # the hidden points are not reloaded
+        # The points are fetched by the browser from the URL
+        url = points_url(filter_values, view_bounds)
+        if url == current_url:
+            url = no_update
+    changed = {key: value for key, value in changes.items() if hideout.get(key) != value}
+    hideout_patch = no_update
+    if changed:
+        hideout_patch = Patch()
+        for key, value in changed.items():
+            hideout_patch[key] = value
+    return url, hideout_patch, cells
+
+
+# Fetch the points of the main map once per selection
+app.clientside_callback(
+    """async function(url) {
+        window.latestPointsUrl = url;
+        const response = await fetch(url);
+        if (!response.ok) {  // an error page is no geobuf, keep the points shown
+            return window.dash_clientside.no_update;
+        }
+        const bytes = new Uint8Array(await response.arrayBuffer());
+        if (window.latestPointsUrl !== url) {  // a newer selection is loading
+            return window.dash_clientside.no_update;
+        }
+        // The GeoJSON layers take geobuf data as a base64 string
+        let binary = '';
+        for (let i = 0; i < bytes.length; i += 0x8000) {
+            binary += String.fromCharCode.apply(null, bytes.subarray(i, i + 0x8000));
+        }
+        return btoa(binary);
+    }""",
+    Output('points_geojson', 'data'),
+    Input('points_url_store', 'data'),
+)
+
+
+# Debounce the view of the main map: it moves on every pan and zoom step, and
+# only reaches the server callbacks once it has been still for VIEW_DEBOUNCE_MS.
+# Every view carries the id of the browser tab and a sequence number, so the
+# server can tell stale views apart (see `claim_view`).
+app.clientside_callback(
+    """async function(bounds, zoom) {
+        const seq = (window.mapViewSeq || 0) + 1;
+        window.mapViewSeq = seq;
+        if (seq > 1) {  // the first view is sent right away
+            await new Promise(resolve => setTimeout(resolve, %d));
+            if (window.mapViewSeq !== seq) {  // the map moved again
+                return window.dash_clientside.no_update;
+            }
+        }
+        if (!window.mapViewSession) {
+            window.mapViewSession = Math.random().toString(36).slice(2) + Date.now().toString(36);
+        }
+        return {bounds: bounds, zoom: zoom, seq: seq, session: window.mapViewSession};
+    }""" % VIEW_DEBOUNCE_MS,
+    Output('map_view_store', 'data'),
+    Input('main_map', 'bounds'),
+    Input('main_map', 'zoom'),
+)
+
+
+# Draw the bounds of the main map on the environmental map, without a server round trip
+app.clientside_callback(
+    """function(bounds) {
+        const b = bounds || [[31.857, 34.652], [32.142, 35.148]];
+        return [[b[0][0], b[0][1]], [b[1][0], b[0][1]], [b[1][0], b[1][1]], [b[0][0], b[1][1]]];
+    }""",
     Output('env_map_bb_polygon', 'positions'),
-    Input('main_map', 'bounds')
+    Input('main_map', 'bounds'),
 )
-def update_env_map_center(bounds):
-    if bounds is None:
-        return generate_bounds([[31.857, 34.652], [32.142, 35.148]])
-    return generate_bounds(bounds)
+
+
+def request_rows():
+    """
+    Select the rows of the `key` query argument of the current request.
+
+    Returns
+    -------
+    numpy.ndarray
+        Sorted positions of the selected rows. Aborts with a 400 error if the
+        key is invalid.
+    """
+    try:
+        filter_values, map_bounds = decode_selection(request.args.get('key', ''), col_unique_values_dict)
+    except ValueError:
+        abort(400)
+    return select_rows(filter_values, map_bounds)
+
+
+@server.route(app.config.routes_pathname_prefix + 'points.geojson')
+def serve_points_geojson():
+    """
+    Serve the accidents of a selection as GeoJSON.
+
+    The selection is given by the `key` query argument, built by `encode_selection`.
+    The features are spliced from `point_features`, with no JSON encoding per request.
+
+    Returns
+    -------
+    flask.Response
+        The GeoJSON FeatureCollection, or a 400 error for an invalid key.
+    """
+    return Response(point_features.select(request_rows()), mimetype='application/json')
+
+
+@server.route(app.config.routes_pathname_prefix + 'points.geobuf')
+def serve_points_geobuf():
+    """
+    Serve the accidents of a selection as geobuf, the format of the map layers.
+
+    Returns
+    -------
+    flask.Response
+        The geobuf FeatureCollection, or a 400 error for an invalid key.
+    """
+    return Response(point_geobuf.select(request_rows()), mimetype='application/x-protobuf')
+
+
+@lru_cache(maxsize=TILE_CACHE_SIZE)
+def render_tile(key, z, x, y):
+    """
+    Encode the accidents of a filter selection in a vector tile.
+
+    Parameters
+    ----------
+    key : str
+        The canonical key of the filter selection, built by `encode_selection`
+        without bounds, so that a tile is cached once per selection.
+    z, x, y : int
+        The tile coordinates.
+
+    Returns
+    -------
+    bytes
+        The encoded tile.
+    """
+    filter_values, _ = decode_selection(key, col_unique_values_dict)
+    rows = filter_index.select(filter_values, rows=point_tiles.tile_rows(z, x, y))
+    return point_tiles.encode(z, x, y, rows)
+
+
+@server.route(app.config.routes_pathname_prefix + 'tiles/<int:z>/<int:x>/<int:y>.mvt')
+def serve_tile(z, x, y):
+    """
+    Serve the accidents of a selection as a Mapbox vector tile.
+
+    The selection is given by the `key` query argument, built by `encode_selection`,
+    e.g. ``/tiles/12/2446/1655.mvt?key=...``. The tile has one ``accidents`` layer
+    of points, tagged with the graph columns. Map-view bounds in the key are
+    ignored, since a tile only covers its own area. Encoded tiles are cached per
+    (filter selection, z, x, y), the least recently used ones being evicted first:
+    the key is re-encoded first, so the many spellings of a selection share a tile.
+
+    Returns
+    -------
+    flask.Response
+        The tile, a 404 error for a tile outside the world or a 400 error for an
+        invalid key.
+    """
+    if z > MAX_ZOOM or x >= 1 << z or y >= 1 << z:
+        abort(404)
+    try:
+        filter_values, _ = decode_selection(request.args.get('key', ''), col_unique_values_dict)
+    except ValueError:
+        abort(400)
+    tile = render_tile(encode_selection(filter_values, col_unique_values_dict), z, x, y)
+    return Response(tile, mimetype='application/vnd.mapbox-vector-tile')
+
+
+@server.route(app.config.routes_pathname_prefix + 'heatmap/<int:layer>/<int:z>/<int:x>/<int:y>.png')
+def serve_heatmap_tile(layer, z, x, y):
+    """
+    Serve a density heatmap tile of one severity.
+
+    Tiles are read from the pyramid written at startup; tiles without any
+    accident are served as a transparent tile. The ``v`` query argument, the
+    digest of the pyramid, is only there to change the URL with the tiles.
+
+    Returns
+    -------
+    flask.Response
+        The PNG tile, or a 404 error for an unknown layer.
+    """
+    if layer >= len(heatmap_layers):
+        abort(404)
+    path = heatmap_tiles.tile_path(heatmap_dir, layer, z, x, y)
+    if not os.path.exists(path):
+        return Response(heatmap_tiles.EMPTY_TILE, mimetype='image/png')
+    return send_file(path, mimetype='image/png', max_age=3600)
+
+
+@server.route(app.config.routes_pathname_prefix + 'cache-stats')
+def serve_cache_stats():
+    """
+    Serve the callback cache counters of the worker process handling the request.
+
+    With BACKGROUND_CALLBACKS the callbacks run in background jobs, and the
+    counters are the ones of every process, kept in the cache.
+
+    Returns
+    -------
+    flask.Response
+        JSON with the cache type, its ``hits`` and ``misses``, and the number of
+        callbacks dropped as ``stale`` for a newer view of the main map.
+    """
+    return jsonify(type=cache.config['CACHE_TYPE'], **read_stats(cache_stats), **read_stats(view_stats))
 
 
 if __name__ == "__main__":
@@ -1,14 +1,31 @@
 window.dashExtensions = Object.assign({}, window.dashExtensions, {
     default: {
-        function0: function(feature, latlng, context) {
-            circleOptions = {
-                fillOpacity: 0,
-                stroke: false,
-                radius: 0
+        function0: function(feature) {
+            const color = feature.properties.color || '#636efa';
+            return {
+                color: color,
+                weight: 0.5,
+                fillColor: color,
+                fillOpacity: 0.6
             };
-            return L.circleMarker(latlng, circleOptions); // render a simple circle marker
         },
-        function1: function(feature, latlng, context) {
+        function1: function(feature, layer) {
+            layer.bindTooltip(`${feature.properties.count} accidents (mostly ${feature.properties.value})`)
+        },
+        function2: function(feature, latlng) {
+            const count = feature.properties.point_count;
+            const size = count < 100 ? 'small' : count < 1000 ? 'medium' : 'large';
+            const label = count >= 10000 ? `${Math.round(count / 1000)}k` : count >= 1000 ? `${Math.round(count / 100) / 10}k` : count;
+            const icon = L.divIcon({
+                html: `<div><span>${label}</span></div>`,
+                className: `marker-cluster marker-cluster-${size}`,
+                iconSize: L.point(40, 40)
+            });
+            return L.marker(latlng, {
+                icon: icon
+            });
+        },
+        function3: function(feature, latlng, context) {
             const {
                 active_col,
                 circleOptions,
@@ -18,8 +35,31 @@ window.dashExtensions = Object.assign({}, window.dashExtensions, {
             circleOptions.fillColor = color_dict[active_col][active_col_val];
             return L.circleMarker(latlng, circleOptions); // render a simple circle marker
         },
-        function2: function(feature, layer, context) {
-            layer.bindTooltip(`${feature.properties.HODESH_TEUNA} (${feature.properties[feature.properties.active_col]})`)
+        function4: function(feature, layer, context) {
+            layer.bindTooltip(`${feature.properties.HODESH_TEUNA} (${feature.properties[context.hideout.active_col]})`)
+        },
+        function5: function(feature, context) {
+            const {
+                filters,
+                bounds,
+                hide_points
+            } = context.hideout;
+            if (hide_points) {
+                return false;
+            }
+            if (!filters) {
+                return true;
+            }
+            for (const col in filters) {
+                if (!filters[col].includes(feature.properties[col])) {
+                    return false;
+                }
+            }
+            if (bounds) {
+                const [lon, lat] = feature.geometry.coordinates;
+                return lat > bounds[0][0] && lat < bounds[1][0] && lon > bounds[0][1] && lon < bounds[1][1];
+            }
+            return true;
         }
     }
 });
\ No newline at end of file
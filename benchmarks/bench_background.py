@@ -0,0 +1,71 @@
+"""
+Time how long the heavy callbacks hold a server thread, in the foreground and
+in the background.
+
+A checklist toggle with the map-view filter on is posted to the graph and
+main map callbacks, with an empty callback cache. In the foreground the
+thread is held for the whole computation; in the background (run with
+``BACKGROUND_CALLBACKS=1``) it is only held by the request starting the job
+and by the polls of its result, every `POLL_INTERVAL` seconds like the
+browser. The end-to-end latency is reported too.
+
+Usage: python benchmarks/bench_background.py
+       BACKGROUND_CALLBACKS=1 python benchmarks/bench_background.py
+"""
+import json
+import time
+
+from synthetic import callback_body  # puts the repository on the path
+import app
+
+REPEAT = 10
+POLL_INTERVAL = 0.1
+VIEW = {'bounds': [[31.9, 34.7], [32.2, 35.0]], 'zoom': 13}
+
+
+def run(client, dependency, body):
+    """Post a callback until it answers, returning the thread time and the latency."""
+    held = 0
+    start = time.perf_counter()
+    request_start = time.perf_counter()
+    response = client.post('/_dash-update-component', json=body)
+    held += time.perf_counter() - request_start
+    if dependency.get('long'):
+        job = json.loads(response.data)
+        while True:
+            time.sleep(POLL_INTERVAL)
+            request_start = time.perf_counter()
+            response = client.post(f"/_dash-update-component?cacheKey={job['cacheKey']}&job={job['job']}",
+                                   json=body)
+            held += time.perf_counter() - request_start
+            if response.status_code == 204 or 'response' in json.loads(response.data):
+                break
+    return held, time.perf_counter() - start
+
+
+def main():
+    client = app.server.test_client()
+    values = {'x_axis_dropdown.value': 'Month', 'color_stack_dropdown.value': 'Day Type',
+              'filter_map_view.value': ['Filter Map-view'], 'points_geojson.hideout': app.hide_out_dict,
+              'points_url_store.data': None, 'graph_structure_store.data': None}
+    for i, label in enumerate(app.non_numerical_labels):
+        values[f'filter_{i + 1}_checklist.value'] = list(app.labels_unique_values_dict[label])[1:]
+    dependencies = [dependency for dependency in json.loads(client.get('/_dash-dependencies').data)
+                    if dependency['output'].startswith(('..contextual_graph.', '..points_url_store.'))]
+    mode = 'background' if app.BACKGROUND_CALLBACKS else 'foreground'
+    print(f"{'mode':>10} {'callback':>16} {'thread held':>11} {'latency':>9}")
+    for dependency in dependencies:
+        held_times, latencies = [], []
+        for seq in range(REPEAT):
+            app.cache.clear()
+            values['map_view_store.data'] = dict(VIEW, seq=seq, session='bench')
+            held, latency = run(client, dependency, callback_body(dependency, values, ['filter_1_checklist.value']))
+            held_times.append(held)
+            latencies.append(latency)
+        name = dependency['output'].strip('.').split('.')[0]
+        print(f'{mode:>10} {name:>16} {sorted(held_times)[REPEAT // 2] * 1e3:>9.1f}ms '
+              f'{sorted(latencies)[REPEAT // 2] * 1e3:>7.1f}ms')
+
+
+if __name__ == '__main__':
+    main()
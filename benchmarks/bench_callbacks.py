@@ -0,0 +1,64 @@
+"""
+Measure what the server sends back for each kind of interaction.
+
+Every interaction is posted to ``/_dash-update-component`` for each callback it
+triggers, the way the browser does, and the bytes of the responses are summed
+(callbacks answering with no update at all are counted as skipped). The cache
+is cleared before every request, so the times include the computation.
+
+Usage: python benchmarks/bench_callbacks.py
+"""
+import json
+import time
+
+from synthetic import callback_body  # puts the repository on the path
+import app
+
+VIEW = [[31.95, 34.72], [32.12, 34.95]]
+INTERACTIONS = [
+    ('x-axis change', {'x_axis_dropdown.value': 'Road Type'}),
+    ('color stack change', {'color_stack_dropdown.value': 'Day Type'}),
+    ('checklist toggle', {'filter_1_checklist.value': None}),
+    ('pan, view filter off', {'map_view_store.data': {'bounds': [[31.96, 34.73], [32.13, 34.96]], 'zoom': 12}}),
+    ('pan, view filter on', {'filter_map_view.value': ['Filter Map-view'],
+                             'map_view_store.data': {'bounds': [[31.96, 34.73], [32.13, 34.96]], 'zoom': 12}}),
+    ('zoom out', {'map_view_store.data': {'bounds': VIEW, 'zoom': 9}}),
+]
+
+
+def initial_values():
+    values = {'x_axis_dropdown.value': 'Month', 'color_stack_dropdown.value': 'Savirity of Accident',
+              'filter_map_view.value': None, 'map_view_store.data': {'bounds': VIEW, 'zoom': 12},
+              'points_geojson.hideout': app.hide_out_dict, 'points_url_store.data': app.initial_points_url,
+              'graph_structure_store.data': app.figure_structure('Month', 'Savirity of Accident', app.fig)}
+    for i, label in enumerate(app.non_numerical_labels):
+        values[f'filter_{i + 1}_checklist.value'] = list(app.labels_unique_values_dict[label])
+    return values
+
+
+def main():
+    client = app.server.test_client()
+    dependencies = [dependency for dependency in json.loads(client.get('/_dash-dependencies').data)
+                    if dependency.get('clientside_function') is None]
+    print(f"{'interaction':>21} {'callbacks':>9} {'skipped':>7} {'bytes':>9} {'time':>9}")
+    for name, change in INTERACTIONS:
+        values = initial_values()
+        if 'filter_1_checklist.value' in change:
+            change = {'filter_1_checklist.value': values['filter_1_checklist.value'][1:]}
+        values.update(change)
+        triggered = [dependency for dependency in dependencies
+                     if {f"{item['id']}.{item['property']}" for item in dependency['inputs']} & change.keys()]
+        n_bytes, skipped, elapsed = 0, 0, 0
+        for dependency in triggered:
+            app.cache.clear()
+            start = time.perf_counter()
+            response = client.post('/_dash-update-component', json=callback_body(dependency, values, list(change)))
+            elapsed += time.perf_counter() - start
+            if response.status_code == 204:
+                skipped += 1
+            n_bytes += len(response.data)
+        print(f'{name:>21} {len(triggered):>9} {skipped:>7} {n_bytes:>8}B {elapsed * 1e3:>7.1f}ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""
+Count the server callbacks run per map gesture, with and without the view debounce.
+
+dash-leaflet reports the view of the main map on every ``moveend``: once per
+drag, but once per step of a scroll zoom, of a held arrow key or of a series
+of short drags. Each gesture below is a timeline of such events. The events
+go through the debounce of the `map_view_store` clientside callback
+(reproduced here), then every view that passes is posted, at its time and in
+its own thread, to each server callback it triggers, with the map-view
+filter on so that all of them do some work. Callbacks dropped by
+`claim_view` for a newer view are counted as stale: on this dataset the
+callbacks take a few ms, so only views reaching the server together, as
+behind a busy worker, are coalesced.
+
+Usage: python benchmarks/bench_drag.py
+"""
+import json
+import threading
+import time
+import uuid
+
+from synthetic import callback_body  # puts the repository on the path
+import app
+
+VIEW = [[31.95, 34.72], [32.12, 34.95]]
+# Times of the moveend events of each gesture, in ms, and the zoom at each event
+GESTURES = [
+    ('single drag', [0], [13]),
+    ('scroll zoom, 5 steps', [0, 120, 240, 360, 480], [13, 12, 11, 10, 9]),
+    ('8 short drags', [180 * i for i in range(8)], [13] * 8),
+    ('held arrow key, 2 s', [100 * i for i in range(20)], [13] * 20),
+    # Views reaching a busy server together, e.g. queued behind slow requests
+    ('10 views queued', [0] * 10, [13] * 10),
+]
+
+
+def debounce(times, delay):
+    """Indices of the events passed by the clientside debounce: the last of every burst."""
+    return [i for i, t in enumerate(times) if i == len(times) - 1 or times[i + 1] - t >= delay]
+
+
+def run_gesture(dependencies, times, zooms, delay):
+    """Replay a gesture, returning the callback requests posted, dropped as stale and completed."""
+    session = uuid.uuid4().hex
+    values = {'x_axis_dropdown.value': 'Month', 'color_stack_dropdown.value': 'Savirity of Accident',
+              'filter_map_view.value': ['Filter Map-view'], 'points_geojson.hideout': app.hide_out_dict,
+              'points_url_store.data': app.initial_points_url,
+              'graph_structure_store.data': app.figure_structure('Month', 'Savirity of Accident', app.fig)}
+    for i, label in enumerate(app.non_numerical_labels):
+        values[f'filter_{i + 1}_checklist.value'] = list(app.labels_unique_values_dict[label])
+    app.cache.clear()
+    stale_before = app.view_stats['stale']
+    statuses = []
+
+    def post(body):
+        statuses.append(app.server.test_client().post('/_dash-update-component', json=body).status_code)
+
+    threads = []
+    start = time.perf_counter()
+    for seq, i in enumerate(debounce(times, delay), start=1):
+        shift = 0.01 * i
+        bounds = [[VIEW[0][0], VIEW[0][1] + shift], [VIEW[1][0], VIEW[1][1] + shift]]
+        values['map_view_store.data'] = {'bounds': bounds, 'zoom': zooms[i], 'seq': seq, 'session': session}
+        time.sleep(max(0, start + (times[i] + delay) / 1000 - time.perf_counter()))
+        for dependency in dependencies:
+            thread = threading.Thread(target=post, args=(callback_body(dependency, values, ['map_view_store.data']),))
+            thread.start()
+            threads.append(thread)
+    for thread in threads:
+        thread.join()
+    return len(threads), app.view_stats['stale'] - stale_before, statuses.count(200)
+
+
+def main():
+    dependencies = [dependency for dependency in json.loads(app.server.test_client().get('/_dash-dependencies').data)
+                    if dependency.get('clientside_function') is None
+                    and any(item['id'] == 'map_view_store' for item in dependency['inputs'])]
+    print(f"{'gesture':>22} {'events':>6} {'debounce':>8} {'callbacks':>9} {'stale':>5} {'completed':>9}")
+    for name, times, zooms in GESTURES:
+        for delay in (0, app.VIEW_DEBOUNCE_MS):
+            posted, stale, completed = run_gesture(dependencies, times, zooms, delay)
+            print(f'{name:>22} {len(times):>6} {delay:>6}ms {posted:>9} {stale:>5} {completed:>9}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+"""
+Time building the contextual bar graph with px.bar and with `stacked_bar_figure`.
+
+Both start from the counts of the 2023 data (the long count table for
+px.bar, the count matrix for the builder, both from a `CountCube`) and end
+with the JSON sent to the browser. The two figures are checked to be equal.
+
+Usage: python benchmarks/bench_figure.py
+"""
+import json
+
+import plotly.express as px
+from plotly.io.json import to_json_plotly
+
+from synthetic import SOURCE_CSV, best_of
+from count_cube import CountCube
+from data_store import load_accidents
+from figures import stacked_bar_figure
+
+PAIRS = [('HODESH_TEUNA', 'HUMRAT_TEUNA'), ('SUG_DEREH', 'PNE_KVISH'), ('YOM_BASHAVUA', 'SUG_YOM')]
+
+
+
+def px_figure(gb_df, x_col, color_stack_col):
+    """The figure of the previous `graph_generator`."""
+    fig = px.bar(gb_df, x=x_col, y='count', color=color_stack_col, template='plotly_white')
+    fig.update_layout(xaxis={'tickmode': 'linear'}, margin={'l': 0, 'r': 0, 't': 25, 'b': 25}, height=400)
+    fig.update_xaxes(title_text=x_col)
+    fig.update_yaxes(title_text='Number of Accidents')
+    fig.update_layout(legend_title_text=color_stack_col)
+    return fig
+
+
+def main():
+    df = load_accidents(SOURCE_CSV)
+    cube = CountCube(df, sorted({col for pair in PAIRS for col in pair}))
+    print(f"{'x':>13} {'color stack':>13} {'px.bar':>9} {'builder':>9} {'speedup':>8}")
+    for x_col, color_stack_col in PAIRS:
+        gb_df = cube.frame(x_col, color_stack_col)
+        counts = cube.matrix(x_col, color_stack_col)
+        px_time, px_json = best_of(lambda: to_json_plotly(px_figure(gb_df, x_col, color_stack_col)), repeat=20)
+        builder_time, builder_json = best_of(lambda: to_json_plotly(stacked_bar_figure(
+            counts, cube.categories[x_col].tolist(), cube.categories[color_stack_col].tolist(),
+            x_col, color_stack_col, x_col, color_stack_col)), repeat=20)
+        assert json.loads(px_json) == json.loads(builder_json)
+        print(f'{x_col:>13} {color_stack_col:>13} {px_time * 1e3:>7.2f}ms {builder_time * 1e3:>7.2f}ms '
+              f'{px_time / builder_time:>7.1f}x')
+
+
+if __name__ == '__main__':
+    main()
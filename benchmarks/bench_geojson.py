@@ -0,0 +1,65 @@
+"""
+Compare the GeoJSON encoders with the GeoDataFrame ``__geo_interface__`` path.
+
+The old path is timed as the callback ran it: select the rows from the
+GeoDataFrame, build ``__geo_interface__`` and let Dash encode it as JSON.
+The `FeatureBuffer` path is timed on a random half of the rows, as a filter
+selection would be, after its one-off build. The app does not use geopandas,
+which has to be installed for this comparison (``pip install geopandas``).
+
+Usage: python benchmarks/bench_geojson.py [n_rows ...]
+"""
+import sys
+import time
+
+import geopandas as gpd
+import numpy as np
+from plotly.io.json import to_json_plotly
+
+from synthetic import make_accidents
+from geojson_encoder import FeatureBuffer, encode_feature_collection
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+PROPERTIES = ['pk_teuna_fikt', 'HODESH_TEUNA', 'SUG_DEREH', 'SUG_YOM', 'YOM_LAYLA',
+              'YOM_BASHAVUA', 'HUMRAT_TEUNA', 'PNE_KVISH']
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return time.perf_counter() - start, result
+
+
+def geo_interface_path(gdf, df):
+    gdf_copy = gdf.loc[gdf['pk_teuna_fikt'].isin(df['pk_teuna_fikt'])].copy()
+    gdf_copy['active_col'] = 'HUMRAT_TEUNA'
+    return to_json_plotly(gdf_copy.__geo_interface__).encode()
+
+
+def encoder_path(df):
+    return encode_feature_collection(
+        df['lat'].values, df['lon'].values, {col: df[col].values for col in PROPERTIES},
+        constants={'active_col': 'HUMRAT_TEUNA'})
+
+
+def main(sizes):
+    print(f"{'points':>10} {'geo_interface':>14} {'encoder':>9} {'speedup':>8} {'old MB':>7} {'new MB':>7} "
+          f"{'buffer build':>13} {'splice 50%':>11}")
+    for n_rows in sizes:
+        df = make_accidents(n_rows)
+        for col in PROPERTIES[2:]:
+            df[col] = df[col].astype('category')
+        gdf = gpd.GeoDataFrame(df, geometry=gpd.points_from_xy(df.lon, df.lat))
+        old_time, old_body = timed(lambda: geo_interface_path(gdf, df))
+        new_time, new_body = timed(lambda: encoder_path(df))
+        build_time, features = timed(lambda: FeatureBuffer(
+            df['lat'].values, df['lon'].values, {col: df[col].values for col in PROPERTIES}))
+        rows = np.flatnonzero(np.random.default_rng(0).random(n_rows) < 0.5)
+        splice_time, _ = timed(lambda: features.select(rows))
+        print(f'{n_rows:>10,} {old_time:>13.3f}s {new_time:>8.3f}s {old_time / new_time:>7.1f}x '
+              f'{len(old_body) / 1e6:>7.1f} {len(new_body) / 1e6:>7.1f} '
+              f'{build_time:>12.3f}s {splice_time:>10.4f}s')
+
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES)
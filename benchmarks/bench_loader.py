@@ -0,0 +1,40 @@
+"""
+Compare parsing the accidents CSV with loading its columnar artifact.
+
+Usage: python benchmarks/bench_loader.py [n_rows ...]
+"""
+import os
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+from synthetic import write_accidents_csv
+from data_store import build_artifact, load_accidents
+
+DEFAULT_SIZES = [10_000, 1_000_000, 10_000_000]
+
+
+def timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+def main(sizes):
+    print(f"{'rows':>12} {'read_csv':>10} {'build':>10} {'load':>10} {'speedup':>9}")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for n_rows in sizes:
+            csv_path = write_accidents_csv(n_rows, os.path.join(tmp_dir, f'accidents_{n_rows}.csv'))
+            cache_dir = os.path.join(tmp_dir, f'cache_{n_rows}')
+            csv_time, _ = timed(pd.read_csv, csv_path)
+            build_time, _ = timed(build_artifact, csv_path, cache_dir)
+            load_time, _ = timed(load_accidents, csv_path, cache_dir)
+            print(f'{n_rows:>12,} {csv_time:>9.3f}s {build_time:>9.3f}s '
+                  f'{load_time:>9.4f}s {csv_time / load_time:>8.0f}x')
+            os.remove(csv_path)
+
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES)
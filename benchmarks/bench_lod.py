@@ -0,0 +1,76 @@
+"""
+Compare the main-map payload of raw points and grid cells against the zoom.
+
+For a 1280x800 px viewport centered on Tel Aviv, on a synthetic
+national-scale table (coordinates jittered by ~500 m), reports for each zoom
+level the accidents in view with the size of their geobuf payload, and the
+grid cells of the level-of-detail layer with the size of their GeoJSON and
+the time to build it. The number of features is the best proxy here for the
+browser render time, which grows linearly with it.
+
+Usage: python benchmarks/bench_lod.py [n_rows] [cell_pixels]
+"""
+import json
+import math
+import sys
+
+import numpy as np
+
+from synthetic import best_of, make_accidents
+from cluster_index import ClusterIndex
+from count_cube import CountCube
+from geobuf_encoder import GeobufBuffer
+from spatial_index import GridIndex
+
+CENTER = (32.08, 34.78)  # Tel Aviv
+VIEWPORT = (1280, 800)
+ZOOMS = range(7, 16)
+COLUMNS = ['HODESH_TEUNA', 'SUG_DEREH', 'SUG_YOM', 'YOM_LAYLA', 'YOM_BASHAVUA', 'HUMRAT_TEUNA', 'PNE_KVISH']
+PROPERTIES = ['pk_teuna_fikt'] + COLUMNS
+
+
+
+def viewport_bounds(zoom):
+    """Bounds of a VIEWPORT sized map centered on CENTER."""
+    world = 256 * 2 ** zoom
+    lat = math.radians(CENTER[0])
+    x = (CENTER[1] + 180) / 360 * world
+    y = (1 - math.log(math.tan(lat) + 1 / math.cos(lat)) / math.pi) / 2 * world
+
+    def to_lat(pixel_y):
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * pixel_y / world))))
+
+    half_width, half_height = VIEWPORT[0] / 2, VIEWPORT[1] / 2
+    return [[to_lat(y + half_height), (x - half_width) / world * 360 - 180],
+            [to_lat(y - half_height), (x + half_width) / world * 360 - 180]]
+
+
+def main(n_rows, cell_pixels):
+    df = make_accidents(n_rows)
+    rng = np.random.default_rng(0)
+    df['lat'] += rng.normal(0, 0.005, n_rows)
+    df['lon'] += rng.normal(0, 0.005, n_rows)
+    for col in COLUMNS[1:]:
+        df[col] = df[col].astype('category')
+    lat, lon = df['lat'].to_numpy(), df['lon'].to_numpy()
+    cube = CountCube(df, COLUMNS)
+    build_time, cells = best_of(lambda: ClusterIndex(lat, lon, cube, zooms=ZOOMS, cell_pixels=cell_pixels),
+                                repeat=1)
+    spatial_index = GridIndex(lat, lon)
+    geobuf = GeobufBuffer(lat, lon, {col: df[col].values for col in PROPERTIES})
+    colors = {value: '#000000' for value in cube.categories['HUMRAT_TEUNA']}
+    print(f'{n_rows:,} rows, {cell_pixels} px cells precomputed in {build_time:.2f}s')
+    print(f"{'zoom':>4} {'points':>10} {'geobuf':>10} {'cells':>7} {'cells json':>11} {'build':>8}")
+    for zoom in ZOOMS:
+        bounds = viewport_bounds(zoom)
+        rows = spatial_index.query(bounds)
+        points_size = len(geobuf.select(rows))
+        cells_time, collection = best_of(
+            lambda: cells.grid_feature_collection(zoom, 'HUMRAT_TEUNA', colors, bounds=bounds))
+        print(f'{zoom:>4} {len(rows):>10,} {points_size / 1e6:>8.2f}MB {len(collection["features"]):>7,} '
+              f'{len(json.dumps(collection)) / 1e6:>9.2f}MB {cells_time * 1e3:>6.1f}ms')
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000,
+         int(sys.argv[2]) if len(sys.argv) > 2 else 32)
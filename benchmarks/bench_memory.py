@@ -0,0 +1,50 @@
+"""
+Report the memory of the accidents table, in bytes per row, per column.
+
+"before" is the table as ``pd.read_csv`` parses the CSV, with Python strings
+and 64-bit numbers; "after" is the table `load_accidents` builds on the
+column store, with its compact schema. Categorical columns count their codes
+and their categories.
+
+The derived state every worker maps besides the table is reported too: the
+arrays of the startup state buffer file, which does not repeat the stored
+columns (see `startup_state`), and its pickle.
+
+Usage: python benchmarks/bench_memory.py
+"""
+import os
+import tempfile
+
+import pandas as pd
+
+from synthetic import SOURCE_CSV
+import app
+import startup_state
+from data_store import load_accidents, stored_columns
+
+
+def main():
+    before = pd.read_csv(SOURCE_CSV)
+    with tempfile.TemporaryDirectory() as cache_dir:
+        after = load_accidents(SOURCE_CSV, cache_dir)
+        before_usage = before.memory_usage(index=False, deep=True) / len(before)
+        after_usage = after.memory_usage(index=False, deep=True) / len(after)
+        print(f"{'column':>14} {'before':>9} {'B/row':>7} {'after':>9} {'B/row':>7}")
+        for col in before.columns:
+            if col in after.columns:
+                after_dtype, after_bytes = str(after[col].dtype), f'{after_usage[col]:.1f}'
+            else:
+                after_dtype, after_bytes = 'dropped', '-'
+            print(f'{col:>14} {str(before[col].dtype):>9} {before_usage[col]:>7.1f} '
+                  f'{after_dtype:>9} {after_bytes:>7}')
+        print(f"{'total':>14} {'':>9} {before_usage.sum():>7.1f} {'':>9} {after_usage.sum():>7.1f}")
+
+        state = startup_state.build_state(after, app.state_params)
+        startup_state.save_state(cache_dir, 'bench', state, stored_columns(after))
+        for name in (startup_state.BUFFERS_NAME, startup_state.STATE_NAME):
+            size = os.path.getsize(os.path.join(cache_dir, name))
+            print(f'{name:>20} {size:>10,}B {size / len(after):>7.1f} B/row')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+"""
+Compare the size of the graph update sent on a checklist toggle: the whole
+figure against the `dash.Patch` of its y arrays.
+
+Each case unchecks the first value of one checklist, from the full selection,
+and serializes both for the contextual graph. The callback only sends the
+patch when the traces and x categories are the ones of the graph shown (see
+`figure_structure`); the ``sends`` column tells which one it sends. The time
+to build the JSON is reported too; the time the browser takes to apply it
+(Plotly.react of a new figure against the update of the y arrays) has to be
+measured in a browser.
+
+Usage: python benchmarks/bench_patch.py
+"""
+from dash import Patch
+from plotly.io.json import to_json_plotly
+
+from synthetic import best_of  # puts the repository on the path
+import app
+
+PAIRS = [('Month', 'Savirity of Accident'), ('Road Type', 'Road Condition'), ('Day of the week', 'Day Type')]
+
+
+
+def y_patch(fig):
+    patch = Patch()
+    for i, trace in enumerate(fig['data']):
+        patch['data'][i]['y'] = trace['y']
+    return patch
+
+
+def main():
+    full_selection = {col: list(app.labels_unique_values_dict[col]) for col in app.non_numerical_labels}
+    print(f"{'x':>15} {'color stack':>21} {'toggled':>21} {'figure':>9} {'patch':>8} {'ratio':>6} "
+          f"{'figure':>8} {'patch':>8} {'sends':>6}")
+    for x_axis, color_stack in PAIRS:
+        shown = app.figure_structure(x_axis, color_stack, app.contextual_graph(
+            x_axis, color_stack, {app.labels_to_cols[key]: values for key, values in full_selection.items()}, None))
+        for label in app.non_numerical_labels:
+            selection = dict(full_selection, **{label: full_selection[label][1:]})
+            filter_values = {app.labels_to_cols[key]: values for key, values in selection.items()}
+            fig = app.contextual_graph(x_axis, color_stack, filter_values, None)
+            figure_time, figure_json = best_of(lambda: to_json_plotly(fig), repeat=20)
+            patch_time, patch_json = best_of(lambda: to_json_plotly(y_patch(fig)), repeat=20)
+            sends = 'patch' if app.figure_structure(x_axis, color_stack, fig) == shown else 'figure'
+            print(f'{x_axis:>15} {color_stack:>21} {label:>21} {len(figure_json):>8}B {len(patch_json):>7}B '
+                  f'{len(figure_json) / len(patch_json):>5.0f}x {figure_time * 1e3:>6.2f}ms {patch_time * 1e3:>6.2f}ms '
+                  f'{sends:>6}')
+
+
+if __name__ == '__main__':
+    main()
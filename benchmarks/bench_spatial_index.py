@@ -0,0 +1,42 @@
+"""
+Time the "Filter Map-view" bounds query against the viewport size.
+
+Compares a full scan of the lat/lon columns with a `GridIndex` query on a
+synthetic national-scale table (coordinates jittered by ~500 m).
+
+Usage: python benchmarks/bench_spatial_index.py [n_rows]
+"""
+import sys
+
+import numpy as np
+
+from synthetic import best_of, make_accidents
+from spatial_index import GridIndex
+
+CENTER = (32.08, 34.78)  # Tel Aviv
+VIEWPORT_SIZES = [0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 5.0]
+
+
+
+def main(n_rows):
+    df = make_accidents(n_rows)
+    rng = np.random.default_rng(0)
+    lat = df['lat'].to_numpy() + rng.normal(0, 0.005, n_rows)
+    lon = df['lon'].to_numpy() + rng.normal(0, 0.005, n_rows)
+    build_time, index = best_of(lambda: GridIndex(lat, lon), repeat=1)
+    print(f'{n_rows:,} rows, {index.n}x{index.n} grid built in {build_time:.2f}s')
+    print(f"{'viewport':>9} {'rows':>10} {'scan':>9} {'grid':>9} {'speedup':>8}")
+    for size in VIEWPORT_SIZES:
+        bounds = [[CENTER[0] - size / 2, CENTER[1] - size / 2],
+                  [CENTER[0] + size / 2, CENTER[1] + size / 2]]
+        (y_ll, x_ll), (y_ur, x_ur) = bounds
+        scan_time, expected = best_of(lambda: np.flatnonzero(
+            (lat > y_ll) & (lat < y_ur) & (lon > x_ll) & (lon < x_ur)))
+        grid_time, rows = best_of(lambda: index.query(bounds))
+        assert np.array_equal(expected, rows)
+        print(f'{size:>8}° {len(rows):>10,} {scan_time * 1e3:>7.1f}ms '
+              f'{grid_time * 1e3:>7.2f}ms {scan_time / grid_time:>7.1f}x')
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5_000_000)
@@ -0,0 +1,79 @@
+"""
+Measure the startup of a worker: import time, boot time and resident memory.
+
+A worker boots by importing `app`, as gunicorn does. Each measurement runs in
+a fresh interpreter:
+
+- imports: the time spent importing the libraries, from ``-X importtime``
+  (the cumulative time of `app` less its own time, which is the data loading
+  and index building);
+- boot: the wall time of ``import app``;
+- RSS: the resident memory of the worker once booted, and the libraries
+  among geopandas, shapely, pyproj, pyogrio and plotly.express it imported.
+
+The first run of each tree is dropped, as it writes the on-disk caches. Pass
+a git revision to measure it too, checked out in a temporary worktree.
+
+Usage: python benchmarks/bench_startup.py [revision]
+"""
+import re
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+
+from synthetic import REPO_DIR
+
+REPEAT = 5
+HEAVY_MODULES = ['geopandas', 'shapely', 'pyproj', 'pyogrio', 'plotly.express']
+PROBE = f"""
+import sys
+import time
+start = time.perf_counter()
+import app
+boot = time.perf_counter() - start
+rss = int(re.search(r'VmRSS:\\s+(\\d+)', open('/proc/self/status').read()).group(1)) * 1024
+heavy = [name for name in {HEAVY_MODULES!r} if name in sys.modules]
+print(boot, rss, ','.join(heavy))
+""".replace('import sys\n', 'import re\nimport sys\n', 1)
+
+
+def measure(tree):
+    """Median import time, boot time and RSS of workers booted from a tree."""
+    imports, boots, rss = [], [], []
+    for run in range(REPEAT + 1):
+        result = subprocess.run([sys.executable, '-X', 'importtime', '-c', PROBE], cwd=tree,
+                                capture_output=True, text=True, check=True)
+        if run == 0:
+            continue
+        boot, resident, heavy = (result.stdout.split() + [''])[:3]
+        app_line = next(line for line in result.stderr.splitlines() if re.search(r'\|\s+app$', line))
+        self_us, cumulative_us = (int(value) for value in re.findall(r'\d+', app_line)[:2])
+        imports.append((cumulative_us - self_us) / 1e6)
+        boots.append(float(boot))
+        rss.append(int(resident))
+    return statistics.median(imports), statistics.median(boots), statistics.median(rss), heavy or '-'
+
+
+def main():
+    trees = [('working tree', REPO_DIR)]
+    worktree = None
+    if len(sys.argv) > 1:
+        worktree = tempfile.mkdtemp(prefix='bench-startup-')
+        subprocess.run(['git', 'worktree', 'add', '--detach', worktree, sys.argv[1]], cwd=REPO_DIR,
+                       capture_output=True, check=True)
+        trees.insert(0, (sys.argv[1], worktree))
+    try:
+        print(f"{'tree':>14} {'imports':>8} {'boot':>8} {'RSS':>9}  heavy libraries")
+        for name, tree in trees:
+            imports, boot, rss, heavy = measure(tree)
+            print(f'{name:>14} {imports:>7.2f}s {boot:>7.2f}s {rss / 2**20:>6.0f}MiB  {heavy}')
+    finally:
+        if worktree is not None:
+            subprocess.run(['git', 'worktree', 'remove', '--force', worktree], cwd=REPO_DIR, capture_output=True)
+            shutil.rmtree(worktree, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,28 @@
+"""
+Time building the derived state against loading it from the startup artifact.
+
+Usage: python benchmarks/bench_state.py
+"""
+import os
+
+from synthetic import best_of  # puts the repository on the path
+import app
+import startup_state
+from data_store import default_cache_dir, stored_columns
+
+
+def main():
+    params = app.state_params
+    key = startup_state.state_key(app.accidents_sha256, params)
+    # The state refers to the column files, so it is rewritten in place, with the same key
+    cache_dir = default_cache_dir(app.accidents_csv)
+    build, state = best_of(lambda: startup_state.build_state(app.df, params))
+    startup_state.save_state(cache_dir, key, state, stored_columns(app.df))
+    size = sum(os.path.getsize(os.path.join(cache_dir, name))
+               for name in (startup_state.STATE_NAME, startup_state.BUFFERS_NAME))
+    load, _ = best_of(lambda: startup_state.load_state(cache_dir, key))
+    print(f'build {build * 1e3:.1f}ms  load {load * 1e3:.1f}ms  artifact {size / 2**20:.1f}MiB')
+
+
+if __name__ == '__main__':
+    main()
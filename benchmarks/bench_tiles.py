@@ -0,0 +1,52 @@
+"""
+Time the encoding of vector tiles around Tel Aviv against the zoom level.
+
+For each zoom, encodes the tile holding Tel Aviv on a synthetic national-scale
+table (coordinates jittered by ~500 m) and reports its points, size and
+encoding time, next to the geobuf payload of the whole table.
+
+Usage: python benchmarks/bench_tiles.py [n_rows]
+"""
+import math
+import sys
+
+import numpy as np
+
+from synthetic import best_of, make_accidents
+from geobuf_encoder import GeobufBuffer
+from vector_tiles import VectorTiles
+
+CENTER = (32.08, 34.78)  # Tel Aviv
+ZOOMS = [6, 8, 10, 12, 14, 16]
+PROPERTIES = ['HODESH_TEUNA', 'SUG_DEREH', 'SUG_YOM', 'YOM_LAYLA', 'YOM_BASHAVUA', 'HUMRAT_TEUNA', 'PNE_KVISH']
+
+
+
+def tile_of(lat, lon, z):
+    n = 1 << z
+    lat = math.radians(lat)
+    return int((lon + 180) / 360 * n), int((1 - math.log(math.tan(lat) + 1 / math.cos(lat)) / math.pi) / 2 * n)
+
+
+def main(n_rows):
+    df = make_accidents(n_rows)
+    rng = np.random.default_rng(0)
+    lat = df['lat'].to_numpy() + rng.normal(0, 0.005, n_rows)
+    lon = df['lon'].to_numpy() + rng.normal(0, 0.005, n_rows)
+    properties = {col: df[col].values for col in PROPERTIES}
+    build_time, tiles = best_of(lambda: VectorTiles(lat, lon, properties, ids=df['pk_teuna_fikt'].values),
+                                repeat=1)
+    _, geobuf = best_of(lambda: GeobufBuffer(lat, lon, properties).select(np.arange(n_rows)),
+                                  repeat=1)
+    print(f'{n_rows:,} rows, tiles indexed in {build_time:.2f}s; '
+          f'full geobuf payload {len(geobuf) / 1e6:.1f} MB')
+    print(f"{'zoom':>4} {'points':>10} {'size':>10} {'encode':>9}")
+    for z in ZOOMS:
+        x, y = tile_of(*CENTER, z)
+        encode_time, tile = best_of(lambda: tiles.encode(z, x, y, tiles.tile_rows(z, x, y)))
+        print(f'{z:>4} {len(tiles.tile_rows(z, x, y)):>10,} {len(tile) / 1e3:>8.1f}kB '
+              f'{encode_time * 1e3:>7.1f}ms')
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
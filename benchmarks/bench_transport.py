@@ -0,0 +1,47 @@
+"""
+Compare the bytes on the wire of the GeoJSON and geobuf point payloads.
+
+Reports the raw and gzip-compressed size of both encodings for the full
+dataset and for a random half of it, and writes the payloads next to this
+script so `parse_points.js` can time their parsing in Node.js.
+
+Usage: python benchmarks/bench_transport.py [n_rows]
+"""
+import gzip
+import os
+import sys
+import time
+
+import numpy as np
+
+from synthetic import make_accidents
+from geobuf_encoder import GeobufBuffer
+from geojson_encoder import FeatureBuffer
+
+PROPERTIES = ['pk_teuna_fikt', 'HODESH_TEUNA', 'SUG_DEREH', 'SUG_YOM', 'YOM_LAYLA',
+              'YOM_BASHAVUA', 'HUMRAT_TEUNA', 'PNE_KVISH']
+OUTPUT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'output')
+
+
+def main(n_rows):
+    df = make_accidents(n_rows)
+    args = (df['lat'].values, df['lon'].values, {col: df[col].values for col in PROPERTIES})
+    encoders = {'geojson': FeatureBuffer(*args), 'geobuf': GeobufBuffer(*args)}
+    selections = {'all': np.arange(n_rows),
+                  '50%': np.flatnonzero(np.random.default_rng(0).random(n_rows) < 0.5)}
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    print(f"{'selection':>9} {'format':>8} {'raw MB':>8} {'gzip MB':>8} {'splice':>8}")
+    for selection, rows in selections.items():
+        for name, encoder in encoders.items():
+            start = time.perf_counter()
+            body = encoder.select(rows)
+            splice_time = time.perf_counter() - start
+            print(f'{selection:>9} {name:>8} {len(body) / 1e6:>8.2f} '
+                  f'{len(gzip.compress(body, 6)) / 1e6:>8.2f} {splice_time * 1e3:>6.1f}ms')
+            if selection == 'all':
+                with open(os.path.join(OUTPUT_DIR, f'points.{name}'), 'wb') as f:
+                    f.write(body)
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 8_832)
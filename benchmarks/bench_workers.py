@@ -0,0 +1,109 @@
+"""
+Measure the memory of the gunicorn workers, at 1, 4 and 8 workers.
+
+The app is served by gunicorn with and without ``preload_app``; once every
+worker has served points, tiles and heatmap tiles, the RSS and the PSS
+(resident memory with each shared page divided among the processes sharing
+it) of the workers are read from ``/proc/<pid>/smaps_rollup``. The total PSS
+includes the master. Pass a git revision to measure it too, checked out in a
+temporary worktree.
+
+Usage: python benchmarks/bench_workers.py [revision]
+"""
+import os
+import re
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from synthetic import REPO_DIR
+
+WORKERS = [1, 4, 8]
+REQUESTS_PER_WORKER = 30
+PATHS = ['/points.geobuf?key=f.f.3.7f.7.7f', '/points.geojson?key=f.f.3.7f.7.7f',
+         '/tiles/8/153/104.mvt?key=f.f.3.7f.7.7f', '/heatmap/0/8/153/104.png']
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def memory(pid):
+    """RSS and PSS of a process, in bytes."""
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        text = f.read()
+    return tuple(int(re.search(rf'^{name}:\s+(\d+)', text, re.M).group(1)) * 1024 for name in ('Rss', 'Pss'))
+
+
+def worker_pids(master):
+    with open(f'/proc/{master}/task/{master}/children') as f:
+        return [int(pid) for pid in f.read().split()]
+
+
+def measure(tree, n_workers, preload, config):
+    """Median RSS and PSS of the workers, and the total PSS, of a server."""
+    port = free_port()
+    command = [sys.executable, '-m', 'gunicorn', '-c', config, '-w', str(n_workers), '-b', f'127.0.0.1:{port}']
+    server = subprocess.Popen(command + (['--preload'] if preload else []) + ['app:server'], cwd=tree,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        base = f'http://127.0.0.1:{port}'
+        while True:
+            try:
+                urllib.request.urlopen(base + PATHS[-1]).read()
+                break
+            except OSError:
+                time.sleep(0.2)
+        while len(worker_pids(server.pid)) < n_workers:
+            time.sleep(0.2)
+        urls = [base + PATHS[i % len(PATHS)] for i in range(REQUESTS_PER_WORKER * n_workers)]
+        with ThreadPoolExecutor(2 * n_workers) as pool:
+            list(pool.map(lambda url: urllib.request.urlopen(url).read(), urls))
+        time.sleep(1)
+        workers = [memory(pid) for pid in worker_pids(server.pid)]
+        total = sum(pss for _, pss in workers) + memory(server.pid)[1]
+        return (statistics.median(rss for rss, _ in workers), statistics.median(pss for _, pss in workers),
+                total)
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    trees = [('working tree', REPO_DIR)]
+    worktree = None
+    if len(sys.argv) > 1:
+        worktree = tempfile.mkdtemp(prefix='bench-workers-')
+        subprocess.run(['git', 'worktree', 'add', '--detach', worktree, sys.argv[1]], cwd=REPO_DIR,
+                       capture_output=True, check=True)
+        trees.insert(0, (sys.argv[1], worktree))
+    # An empty configuration, so that only the command line decides the preloading
+    config = tempfile.NamedTemporaryFile('w', suffix='.py', delete=False)
+    config.close()
+    try:
+        print(f"{'tree':>14} {'preload':>7} {'workers':>7} {'RSS/worker':>10} {'PSS/worker':>10} {'total PSS':>9}")
+        for name, tree in trees:
+            # A first server writes the on-disk caches of the tree
+            measure(tree, 1, False, config.name)
+            for preload in (False, True):
+                for n_workers in WORKERS:
+                    rss, pss, total = measure(tree, n_workers, preload, config.name)
+                    print(f'{name:>14} {str(preload):>7} {n_workers:>7} {rss / 2**20:>7.0f}MiB '
+                          f'{pss / 2**20:>7.0f}MiB {total / 2**20:>6.0f}MiB')
+    finally:
+        os.unlink(config.name)
+        if worktree is not None:
+            subprocess.run(['git', 'worktree', 'remove', '--force', worktree], cwd=REPO_DIR, capture_output=True)
+            shutil.rmtree(worktree, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,24 @@
+// Time the client-side parsing of the payloads written by bench_transport.py.
+// Needs the decoders dash-leaflet bundles: npm install geobuf@3 pbf@3
+const fs = require('fs');
+const path = require('path');
+const geobuf = require('geobuf');
+const Pbf = require('pbf');
+
+const dir = path.join(__dirname, 'output');
+const json = fs.readFileSync(path.join(dir, 'points.geojson'), 'utf8');
+const buffer = fs.readFileSync(path.join(dir, 'points.geobuf'));
+
+function bestOf(label, parse, repeat = 10) {
+    let best = Infinity;
+    let features = 0;
+    for (let i = 0; i < repeat; i++) {
+        const start = process.hrtime.bigint();
+        features = parse().features.length;
+        best = Math.min(best, Number(process.hrtime.bigint() - start) / 1e6);
+    }
+    console.log(`${label.padStart(8)} ${features} features ${best.toFixed(1)}ms`);
+}
+
+bestOf('geojson', () => JSON.parse(json));
+bestOf('geobuf', () => geobuf.decode(new Pbf(buffer)));
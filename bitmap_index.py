@@ -0,0 +1,160 @@
+"""
+Bitmap index over the categorical filter columns.
+
+Every (column, value) pair gets a packed bitset with one bit per row, stored
+as little-endian uint64 words. A checklist filter is then an OR of the
+selected values' bitsets within a column, and an AND across columns, instead
+of a string comparison per row.
+"""
+import numpy as np
+import pandas as pd
+
+
+def pack_mask(mask):
+    """
+    Pack a boolean row mask into uint64 words.
+
+    Parameters
+    ----------
+    mask : numpy.ndarray
+        Boolean array with one entry per row.
+
+    Returns
+    -------
+    numpy.ndarray
+        uint64 words, bit ``i % 64`` of word ``i // 64`` being ``mask[i]``.
+    """
+    packed = np.packbits(mask, bitorder='little')
+    padding = -len(packed) % 8
+    if padding:
+        packed = np.concatenate([packed, np.zeros(padding, dtype=np.uint8)])
+    return packed.view('<u8')
+
+
+def unpack_rows(words, n_rows):
+    """
+    Return the positions of the rows whose bit is set.
+
+    Parameters
+    ----------
+    words : numpy.ndarray
+        uint64 words, as returned by `pack_mask`.
+    n_rows : int
+        Number of rows the words cover.
+
+    Returns
+    -------
+    numpy.ndarray
+        Sorted row positions.
+    """
+    bits = np.unpackbits(words.view(np.uint8), count=n_rows, bitorder='little')
+    return np.flatnonzero(bits)
+
+
+def popcount(words):
+    """
+    Count the set bits of packed words.
+
+    Parameters
+    ----------
+    words : numpy.ndarray
+        uint64 words, as returned by `pack_mask`.
+
+    Returns
+    -------
+    int
+        The number of rows selected.
+    """
+    return int(np.bitwise_count(words).sum())
+
+
+class BitmapIndex:
+    """
+    Packed bitsets for every value of a set of categorical columns.
+
+    Parameters
+    ----------
+    df : pandas.DataFrame
+        The table to index.
+    columns : list of str
+        The columns to index.
+    """
+
+    def __init__(self, df, columns):
+        self.n_rows = len(df)
+        self.n_words = (self.n_rows + 63) // 64
+        self.bitsets = {}
+        for col in columns:
+            values = pd.Categorical(df[col])
+            self.bitsets[col] = {
+                value: pack_mask(values.codes == code) for code, value in enumerate(values.categories)
+            }
+
+    def all_rows(self):
+        """Return a bitset with every row selected."""
+        return pack_mask(np.ones(self.n_rows, dtype=bool))
+
+    def bitset(self, filter_values):
+        """
+        Compute the bitset of the rows matching the checklist filters.
+
+        Parameters
+        ----------
+        filter_values : dict
+            Maps an indexed column to the list of its selected values. Values
+            that are not in the index match no row.
+
+        Returns
+        -------
+        numpy.ndarray
+            uint64 words of the selected rows.
+        """
+        selection = self.all_rows()
+        for col, values in filter_values.items():
+            column_bitsets = self.bitsets[col]
+            column_selection = np.zeros(self.n_words, dtype=np.uint64)
+            for value in values or []:
+                if value in column_bitsets:
+                    column_selection |= column_bitsets[value]
+            selection &= column_selection
+        return selection
+
+    def select(self, filter_values, rows=None):
+        """
+        Return the positions of the rows matching the checklist filters.
+
+        Parameters
+        ----------
+        filter_values : dict
+            Maps an indexed column to the list of its selected values.
+        rows : numpy.ndarray, optional
+            Sorted candidate row positions (e.g. from a spatial query). Only
+            their bits are tested, and the result is a subset of them.
+
+        Returns
+        -------
+        numpy.ndarray
+            Sorted row positions.
+        """
+        selection = self.bitset(filter_values)
+        if rows is None:
+            return unpack_rows(selection, self.n_rows)
+        rows = np.asarray(rows, dtype=np.int64)
+        bits = (selection[rows >> 6] >> (rows & 63).astype(np.uint64)) & np.uint64(1)
+        return rows[bits.astype(bool)]
+
+    def count(self, filter_values):
+        """
+        Count the rows matching the checklist filters.
+
+        Parameters
+        ----------
+        filter_values : dict
+            Maps an indexed column to the list of its selected values.
+
+        Returns
+        -------
+        int
+            The number of rows selected.
+        """
+        return popcount(self.bitset(filter_values))
@@ -0,0 +1,259 @@
+"""
+Grid clustering of the accident points, precomputed per zoom level.
+
+At each zoom level the world is cut into square cells of `CELL_PIXELS` screen
+pixels (by default), each cell holding one cluster. Cells are aligned on the tile grid, so
+the cells of a zoom level nest in those of the level above and the levels form
+a hierarchy. For every level, the points are counted once per (cell, category
+combination) pair, with the sum of their coordinates: the clusters of any
+checklist selection are then a weighted sum over the selected combinations,
+without visiting the rows.
+"""
+import numpy as np
+
+from vector_tiles import world_position
+
+
+# Size of a cluster cell on screen, close to the 125 px radius of the browser
+# clustering it replaces.
+CELL_PIXELS = 128
+TILE_PIXELS = 256
+MAX_CLUSTER_ZOOM = 20
+
+
+class ClusterIndex:
+    """
+    Per-zoom point clusters, aggregated over the dimensions of a count cube.
+
+    Parameters
+    ----------
+    lat : numpy.ndarray
+        Latitude of each row, float32 or float64. Rows with a missing
+        coordinate are left out.
+    lon : numpy.ndarray
+        Longitude of each row.
+    cube : count_cube.CountCube
+        The cube of the same rows, whose dimensions can be filtered.
+    zooms : iterable of int, optional
+        The zoom levels to precompute.
+    cell_pixels : int, optional
+        Size of a cell on screen, a power of two up to `TILE_PIXELS`.
+    """
+
+    def __init__(self, lat, lon, cube, zooms=range(0, 13), cell_pixels=CELL_PIXELS):
+        self.cube = cube
+        self.cells_per_tile = TILE_PIXELS // cell_pixels
+        # The columns are kept as they are, e.g. float32 and memory-mapped;
+        # positions and centroids are computed in float64
+        lat, lon = np.asarray(lat), np.asarray(lon)
+        valid = np.isfinite(lat) & np.isfinite(lon)
+        self.lat, self.lon, self.valid = lat, lon, valid
+        # Cell of every row at the deepest level; shifted right for the others
+        scale = float(self.cells_per_tile << MAX_CLUSTER_ZOOM)
+        x, y = world_position(np.where(valid, lat, 0).astype(np.float64), np.where(valid, lon, 0).astype(np.float64))
+        self.cell_x = (x * scale).astype(np.uint32)
+        self.cell_y = (y * scale).astype(np.uint32)
+        combos = np.ravel_multi_index([cube.codes[col] for col in cube.columns], cube.shape)[valid]
+        lat, lon = lat[valid].astype(np.float64), lon[valid].astype(np.float64)
+
+        self.cells = {}
+        self.pair_cells, self.pair_combos = {}, {}
+        self.pair_counts, self.pair_lat, self.pair_lon = {}, {}, {}
+        for zoom in zooms:
+            keys = self._cell_keys(zoom, np.flatnonzero(valid))
+            self.cells[zoom], cell_index = np.unique(keys, return_inverse=True)
+            pairs, pair_index = np.unique(cell_index.astype(np.int64) * cube.counts.size + combos,
+                                          return_inverse=True)
+            self.pair_cells[zoom], self.pair_combos[zoom] = np.divmod(pairs, cube.counts.size)
+            self.pair_counts[zoom] = np.bincount(pair_index, minlength=len(pairs))
+            self.pair_lat[zoom] = np.bincount(pair_index, weights=lat, minlength=len(pairs))
+            self.pair_lon[zoom] = np.bincount(pair_index, weights=lon, minlength=len(pairs))
+
+    def _cell_keys(self, zoom, rows):
+        """Key of the cell of each row at a zoom level, ordered like the cells."""
+        shift = np.uint64(MAX_CLUSTER_ZOOM - zoom)
+        return (self.cell_y[rows].astype(np.uint64) >> shift) << np.uint64(32) | \
+            self.cell_x[rows].astype(np.uint64) >> shift
+
+    def _selected_pairs(self, zoom, filter_values):
+        """Mask of the (cell, combination) pairs of a zoom level in a checklist selection."""
+        selected = np.ones(self.cube.shape, dtype=bool)
+        for col, values in (filter_values or {}).items():
+            axis = self.cube.columns.index(col)
+            broadcast_shape = [1] * selected.ndim
+            broadcast_shape[axis] = -1
+            selected &= np.asarray(self.cube.categories[col].isin(values or [])).reshape(broadcast_shape)
+        return selected.ravel()[self.pair_combos[zoom]]
+
+    def clusters(self, zoom, filter_values=None, rows=None):
+        """
+        Aggregate a selection into the clusters of a zoom level.
+
+        Parameters
+        ----------
+        zoom : int
+            One of the precomputed zoom levels.
+        filter_values : dict, optional
+            Maps a cube dimension to the list of its selected values. Ignored
+            when `rows` is given.
+        rows : numpy.ndarray, optional
+            Positions of the selected rows, clustered directly.
+
+        Returns
+        -------
+        lat, lon : numpy.ndarray
+            Centroid of each non-empty cluster.
+        counts : numpy.ndarray
+            Number of points of each cluster.
+        """
+        n_cells = len(self.cells[zoom])
+        if rows is None:
+            keep = self._selected_pairs(zoom, filter_values)
+            cells = self.pair_cells[zoom][keep]
+            counts = np.bincount(cells, weights=self.pair_counts[zoom][keep], minlength=n_cells)
+            lat_sums = np.bincount(cells, weights=self.pair_lat[zoom][keep], minlength=n_cells)
+            lon_sums = np.bincount(cells, weights=self.pair_lon[zoom][keep], minlength=n_cells)
+        else:
+            rows = rows[self.valid[rows]]
+            cells = np.searchsorted(self.cells[zoom], self._cell_keys(zoom, rows))
+            counts = np.bincount(cells, minlength=n_cells).astype(np.float64)
+            lat_sums = np.bincount(cells, weights=self.lat[rows], minlength=n_cells)
+            lon_sums = np.bincount(cells, weights=self.lon[rows], minlength=n_cells)
+        non_empty = np.flatnonzero(counts)
+        counts = counts[non_empty]
+        return lat_sums[non_empty] / counts, lon_sums[non_empty] / counts, counts.astype(np.int64)
+
+    def feature_collection(self, zoom, filter_values=None, rows=None):
+        """
+        Return the clusters of a selection as a GeoJSON FeatureCollection.
+
+        Every feature has the ``cluster`` and ``point_count`` properties of the
+        clusters built by Leaflet's supercluster.
+
+        Parameters
+        ----------
+        zoom : int
+            One of the precomputed zoom levels.
+        filter_values : dict, optional
+            Maps a cube dimension to the list of its selected values.
+        rows : numpy.ndarray, optional
+            Positions of the selected rows.
+
+        Returns
+        -------
+        dict
+            The FeatureCollection.
+        """
+        lat, lon, counts = self.clusters(zoom, filter_values, rows)
+        return {'type': 'FeatureCollection', 'features': [
+            {'type': 'Feature', 'geometry': {'type': 'Point', 'coordinates': [x, y]},
+             'properties': {'cluster': True, 'point_count': count}}
+            for y, x, count in zip(lat.tolist(), lon.tolist(), counts.tolist())
+        ]}
+
+    def cell_counts(self, zoom, col, filter_values=None, rows=None, bounds=None):
+        """
+        Count a selection per cell of a zoom level and value of a column.
+
+        Parameters
+        ----------
+        zoom : int
+            The zoom level. Unless it is precomputed, `rows` must be given.
+        col : str
+            A cube dimension.
+        filter_values : dict, optional
+            Maps a cube dimension to the list of its selected values. Ignored
+            when `rows` is given.
+        rows : numpy.ndarray, optional
+            Positions of the selected rows, counted directly.
+        bounds : list, optional
+            ``[[lat_ll, lon_ll], [lat_ur, lon_ur]]``: only the cells overlapping
+            them are returned.
+
+        Returns
+        -------
+        keys : numpy.ndarray
+            Key of each non-empty cell, see `cell_bounds`.
+        counts : numpy.ndarray
+            Counts of shape ``(len(keys), len(cube.categories[col]))``.
+        """
+        n_values = len(self.cube.categories[col])
+        if rows is None:
+            keep = self._selected_pairs(zoom, filter_values)
+            keys = self.cells[zoom]
+            cells = self.pair_cells[zoom][keep]
+            values = np.unravel_index(self.pair_combos[zoom][keep], self.cube.shape)[self.cube.columns.index(col)]
+            weights = self.pair_counts[zoom][keep]
+        else:
+            rows = rows[self.valid[rows]]
+            keys, cells = np.unique(self._cell_keys(zoom, rows), return_inverse=True)
+            values = self.cube.codes[col][rows]
+            weights = None
+        counts = np.bincount(cells * n_values + values, weights=weights,
+                             minlength=len(keys) * n_values).reshape(-1, n_values).astype(np.int64)
+        keep = counts.any(axis=1)
+        if bounds is not None:
+            (y_ll, x_ll), (y_ur, x_ur) = bounds
+            (x0, x1), (y1, y0) = world_position(np.array([y_ll, y_ur]), np.array([x_ll, x_ur]))
+            scale = self.cells_per_tile << zoom
+            cell_x, cell_y = keys & np.uint64(0xffffffff), keys >> np.uint64(32)
+            keep &= (cell_x >= int(x0 * scale)) & (cell_x <= int(x1 * scale)) & \
+                (cell_y >= int(y0 * scale)) & (cell_y <= int(y1 * scale))
+        return keys[keep], counts[keep]
+
+    def cell_bounds(self, zoom, keys):
+        """
+        Return the corners of cells.
+
+        Parameters
+        ----------
+        zoom : int
+            The zoom level of the cells.
+        keys : numpy.ndarray
+            Cell keys, as returned by `cell_counts`.
+
+        Returns
+        -------
+        lat_north, lat_south, lon_west, lon_east : numpy.ndarray
+            The edges of each cell.
+        """
+        scale = float(self.cells_per_tile << zoom)
+        x = (keys & np.uint64(0xffffffff)).astype(np.float64) / scale
+        y = (keys >> np.uint64(32)).astype(np.float64) / scale
+        lat_north = np.degrees(np.arctan(np.sinh(np.pi * (1 - 2 * y))))
+        lat_south = np.degrees(np.arctan(np.sinh(np.pi * (1 - 2 * (y + 1 / scale)))))
+        return lat_north, lat_south, x * 360 - 180, (x + 1 / scale) * 360 - 180
+
+    def grid_feature_collection(self, zoom, col, colors, filter_values=None, rows=None, bounds=None):
+        """
+        Return the cells of a selection as a GeoJSON FeatureCollection of squares.
+
+        Every feature has the ``count`` of the cell, its most frequent ``value``
+        of `col` and the ``color`` of that value.
+
+        Parameters
+        ----------
+        zoom : int
+            The zoom level of the cells.
+        col : str
+            The cube dimension giving the color of the cells.
+        colors : dict
+            Maps the values of `col` to their color. Values without a color
+            get a ``null`` one.
+        filter_values, rows, bounds
+            The selection, see `cell_counts`.
+
+        Returns
+        -------
+        dict
+            The FeatureCollection.
+        """
+        keys, counts = self.cell_counts(zoom, col, filter_values, rows, bounds)
+        north, south, west, east = (edge.tolist() for edge in self.cell_bounds(zoom, keys))
+        dominant = self.cube.categories[col][counts.argmax(axis=1)].tolist()
+        return {'type': 'FeatureCollection', 'features': [
+            {'type': 'Feature',
+             'geometry': {'type': 'Polygon', 'coordinates': [[[w, s], [e, s], [e, n], [w, n], [w, s]]]},
+             'properties': {'count': count, 'value': value, 'color': colors.get(value)}}
+            for n, s, w, e, count, value in zip(north, south, west, east, counts.sum(axis=1).tolist(), dominant)
+        ]}
@@ -0,0 +1,125 @@
+"""
+Pre-aggregated accident counts over the graph dimensions.
+
+Every bar graph of the dashboard counts accidents over two of the categorical
+dimensions, after the checklist filters. `CountCube` counts every combination
+of all the dimensions once, with a single `np.bincount`, so a graph for any
+checklist selection is answered by slicing and summing the cube instead of
+grouping the rows.
+"""
+import numpy as np
+import pandas as pd
+
+
+class CountCube:
+    """
+    Dense N-dimensional count array, one axis per categorical column.
+
+    Parameters
+    ----------
+    df : pandas.DataFrame
+        The table to aggregate.
+    columns : list of str
+        The dimensions of the cube.
+    """
+
+    def __init__(self, df, columns):
+        self.columns = list(columns)
+        self.categories = {}
+        self.codes = {}
+        for col in self.columns:
+            values = pd.Categorical(df[col])
+            self.categories[col] = values.categories
+            self.codes[col] = values.codes
+        self.shape = tuple(len(self.categories[col]) for col in self.columns)
+        combined = np.ravel_multi_index([self.codes[col] for col in self.columns], self.shape)
+        self.counts = np.bincount(combined, minlength=int(np.prod(self.shape))).reshape(self.shape)
+
+    def matrix(self, x_col, color_stack_col, filter_values=None):
+        """
+        Count the accidents per (x, color stack) pair from the cube.
+
+        Parameters
+        ----------
+        x_col : str
+            Dimension of the x-axis.
+        color_stack_col : str
+            Dimension of the color stack, different from `x_col`.
+        filter_values : dict, optional
+            Maps a dimension to the list of its selected values.
+
+        Returns
+        -------
+        numpy.ndarray
+            Counts of shape ``(len(categories[x_col]), len(categories[color_stack_col]))``.
+        """
+        counts = self.counts
+        for col, values in (filter_values or {}).items():
+            axis = self.columns.index(col)
+            selected = np.asarray(self.categories[col].isin(values or []))
+            if col in (x_col, color_stack_col):
+                # Zero the unselected slices, keeping the axis aligned with the categories
+                broadcast_shape = [1] * counts.ndim
+                broadcast_shape[axis] = -1
+                counts = counts * selected.reshape(broadcast_shape)
+            else:
+                counts = np.compress(selected, counts, axis=axis)
+        x_axis, color_axis = self.columns.index(x_col), self.columns.index(color_stack_col)
+        other_axes = tuple(axis for axis in range(len(self.columns)) if axis not in (x_axis, color_axis))
+        counts = counts.sum(axis=other_axes)
+        return counts if x_axis < color_axis else counts.T
+
+    def rows_matrix(self, x_col, color_stack_col, rows):
+        """
+        Count the accidents per (x, color stack) pair over a row selection.
+
+        Parameters
+        ----------
+        x_col : str
+            Dimension of the x-axis.
+        color_stack_col : str
+            Dimension of the color stack.
+        rows : numpy.ndarray
+            Positions of the selected rows.
+
+        Returns
+        -------
+        numpy.ndarray
+            Counts of shape ``(len(categories[x_col]), len(categories[color_stack_col]))``.
+        """
+        n_color = len(self.categories[color_stack_col])
+        combined = self.codes[x_col][rows].astype(np.int64) * n_color + self.codes[color_stack_col][rows]
+        return np.bincount(combined, minlength=len(self.categories[x_col]) * n_color).reshape(-1, n_color)
+
+    def frame(self, x_col, color_stack_col, filter_values=None, rows=None):
+        """
+        Return the counts in the long format of ``df.groupby([x, color]).size()``.
+
+        Parameters
+        ----------
+        x_col : str
+            Dimension of the x-axis.
+        color_stack_col : str
+            Dimension of the color stack.
+        filter_values : dict, optional
+            Maps a dimension to the list of its selected values. Ignored when
+            `rows` is given.
+        rows : numpy.ndarray, optional
+            Positions of the selected rows, counted directly instead of the cube.
+
+        Returns
+        -------
+        pandas.DataFrame
+            Columns `x_col`, `color_stack_col` and ``count``, one row per
+            non-empty pair, sorted by x then by color stack.
+        """
+        if rows is None:
+            counts = self.matrix(x_col, color_stack_col, filter_values)
+        else:
+            counts = self.rows_matrix(x_col, color_stack_col, rows)
+        x_idx, color_idx = np.nonzero(counts)
+        return pd.DataFrame({
+            x_col: self.categories[x_col][x_idx],
+            color_stack_col: self.categories[color_stack_col][color_idx],
+            'count': counts[x_idx, color_idx],
+        })
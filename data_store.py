@@ -0,0 +1,299 @@
+"""
+Columnar on-disk cache for the accidents CSV.
+
+The first load parses the CSV once and writes every column as its own ``.npy``
+file next to a small JSON manifest. The columns get a compact schema: the six
+text columns are stored as categorical codes, with their categories kept in
+the manifest, the month as uint8, the settlement code as int32 and the
+coordinates as float32 (lat/lon are derived from ITM coordinates in whole
+metres, and float32 keeps them to about 0.4 m here). The ITM X/Y columns
+themselves are not used once lat/lon exist, and are not stored. Later loads
+memory-map the ``.npy`` files, so building the DataFrame does not parse or
+copy the column data.
+
+The artifact is rebuilt whenever the CSV changes, and the files of its earlier
+versions are then removed. A matching size and mtime is trusted as is;
+otherwise the CSV is hashed, and a matching hash only refreshes the recorded
+mtime.
+"""
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+ARTIFACT_VERSION = 3
+MANIFEST_NAME = 'manifest.json'
+
+CATEGORICAL_COLUMNS = ['SUG_DEREH', 'SUG_YOM', 'YOM_LAYLA',
+                       'YOM_BASHAVUA', 'HUMRAT_TEUNA', 'PNE_KVISH']
+COLUMN_DTYPES = {
+    'pk_teuna_fikt': np.int64, 'SEMEL_YISHUV': np.int32, 'HODESH_TEUNA': np.uint8,
+    'lat': np.float32, 'lon': np.float32
+}
+# Columns of the CSV left out of the artifact
+DROPPED_COLUMNS = ['X', 'Y']
+# Files earlier versions wrote into the artifact directory, removed on a rebuild
+OBSOLETE_FILES = ['palette.json']
+
+
+def default_cache_dir(csv_path):
+    """
+    Return the directory used for the artifact of `csv_path`.
+
+    Parameters
+    ----------
+    csv_path : str
+        Path to the source CSV file.
+
+    Returns
+    -------
+    str
+        ``.cache/<csv name>`` next to the CSV file.
+    """
+    csv_dir, csv_name = os.path.split(os.path.abspath(csv_path))
+    return os.path.join(csv_dir, '.cache', os.path.splitext(csv_name)[0])
+
+
+def file_sha256(path, chunk_size=1 << 20):
+    """
+    Compute the SHA-256 hex digest of a file, reading it in chunks.
+
+    Parameters
+    ----------
+    path : str
+        Path to the file.
+    chunk_size : int, optional
+        Number of bytes read at a time.
+
+    Returns
+    -------
+    str
+        The hex digest.
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _source_stat(csv_path):
+    stat = os.stat(csv_path)
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+def read_manifest(cache_dir):
+    """
+    Read the artifact manifest, or return None if there is no usable one.
+
+    Parameters
+    ----------
+    cache_dir : str
+        The artifact directory.
+
+    Returns
+    -------
+    dict or None
+        The manifest, or None if it is missing, unreadable or from another
+        artifact version.
+    """
+    try:
+        with open(os.path.join(cache_dir, MANIFEST_NAME)) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if manifest.get('version') != ARTIFACT_VERSION:
+        return None
+    return manifest
+
+
+def _write_manifest(cache_dir, manifest):
+    # Write then rename, so a reader never sees a half-written manifest.
+    path = os.path.join(cache_dir, MANIFEST_NAME)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(tmp_path, path)
+
+
+def _save_column(cache_dir, name, values):
+    path = os.path.join(cache_dir, f'{name}.npy')
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'wb') as f:
+        np.save(f, np.ascontiguousarray(values))
+    os.replace(tmp_path, path)
+
+
+def is_fresh(manifest, csv_path):
+    """
+    Check whether an artifact manifest still matches the CSV on disk.
+
+    When size or mtime differ, the CSV is hashed and compared with the recorded
+    hash, so a touched or copied file does not trigger a rebuild.
+
+    Parameters
+    ----------
+    manifest : dict or None
+        The manifest returned by `read_manifest`.
+    csv_path : str
+        Path to the source CSV file.
+
+    Returns
+    -------
+    bool
+        True if the artifact can be used as is.
+    """
+    if manifest is None:
+        return False
+    source = manifest['source']
+    stat = _source_stat(csv_path)
+    if stat['size'] == source['size'] and stat['mtime_ns'] == source['mtime_ns']:
+        return True
+    return stat['size'] == source['size'] and file_sha256(csv_path) == source['sha256']
+
+
+def build_artifact(csv_path, cache_dir):
+    """
+    Parse the CSV and write the columnar artifact.
+
+    Parameters
+    ----------
+    csv_path : str
+        Path to the source CSV file.
+    cache_dir : str
+        Directory to write the column files and the manifest into.
+
+    Returns
+    -------
+    dict
+        The manifest of the new artifact.
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    source = _source_stat(csv_path)
+    source['sha256'] = file_sha256(csv_path)
+    dtypes = dict(COLUMN_DTYPES)
+    dtypes.update({col: str for col in CATEGORICAL_COLUMNS})
+    df = pd.read_csv(csv_path, dtype=dtypes, usecols=lambda col: col not in DROPPED_COLUMNS)
+
+    columns = []
+    categories = {}
+    for col in df.columns:
+        if col in CATEGORICAL_COLUMNS:
+            values = pd.Categorical(df[col])
+            categories[col] = values.categories.tolist()
+            _save_column(cache_dir, col, values.codes)
+        else:
+            _save_column(cache_dir, col, df[col].to_numpy())
+        columns.append(col)
+
+    manifest = {
+        'version': ARTIFACT_VERSION,
+        'source': source,
+        'n_rows': len(df),
+        'columns': columns,
+        'categories': categories,
+    }
+    _write_manifest(cache_dir, manifest)
+    # Remove the column files of an earlier schema, which the manifest no longer lists
+    stale = [name for name in os.listdir(cache_dir)
+             if (name.endswith('.npy') and name[:-len('.npy')] not in columns) or name in OBSOLETE_FILES]
+    for name in stale:
+        os.remove(os.path.join(cache_dir, name))
+    return manifest
+
+
+def load_column(cache_dir, col):
+    """
+    Memory-map the stored values of a column, read-only.
+
+    Parameters
+    ----------
+    cache_dir : str
+        The artifact directory.
+    col : str
+        The column name.
+
+    Returns
+    -------
+    numpy.memmap
+        The values, or the categorical codes of a text column.
+    """
+    return np.load(os.path.join(cache_dir, f'{col}.npy'), mmap_mode='r')
+
+
+def stored_columns(df):
+    """
+    Return the memory-mapped arrays behind a table loaded from an artifact.
+
+    Parameters
+    ----------
+    df : pandas.DataFrame
+        A table returned by `load_artifact`.
+
+    Returns
+    -------
+    dict
+        Maps each column to its stored array: the values, or the codes of a
+        categorical column. The arrays are the ones the table is built on.
+    """
+    return {col: df[col].array.codes if isinstance(df[col].dtype, pd.CategoricalDtype) else df[col].to_numpy()
+            for col in df.columns}
+
+
+def load_artifact(cache_dir, manifest):
+    """
+    Build a DataFrame on top of the memory-mapped column files.
+
+    Parameters
+    ----------
+    cache_dir : str
+        The artifact directory.
+    manifest : dict
+        The manifest of the artifact.
+
+    Returns
+    -------
+    pandas.DataFrame
+        The accidents table, with the text columns as categoricals.
+    """
+    data = {}
+    for col in manifest['columns']:
+        values = load_column(cache_dir, col)
+        if col in manifest['categories']:
+            values = pd.Categorical.from_codes(
+                values, categories=manifest['categories'][col], validate=False)
+        data[col] = values
+    # copy=False keeps every column backed by its own memory map.
+    return pd.DataFrame(data, copy=False)
+
+
+def load_accidents(csv_path, cache_dir=None):
+    """
+    Load the accidents table, rebuilding the columnar artifact if needed.
+
+    Parameters
+    ----------
+    csv_path : str
+        Path to the source CSV file.
+    cache_dir : str, optional
+        The artifact directory. Defaults to `default_cache_dir(csv_path)`.
+
+    Returns
+    -------
+    pandas.DataFrame
+        The accidents table, with the text columns as categoricals.
+    """
+    if cache_dir is None:
+        cache_dir = default_cache_dir(csv_path)
+    manifest = read_manifest(cache_dir)
+    if not is_fresh(manifest, csv_path):
+        manifest = build_artifact(csv_path, cache_dir)
+    else:
+        stat = _source_stat(csv_path)
+        if manifest['source']['mtime_ns'] != stat['mtime_ns']:
+            # Same content, new mtime: record it to skip hashing next time.
+            manifest['source'].update(stat)
+            _write_manifest(cache_dir, manifest)
+    return load_artifact(cache_dir, manifest)
@@ -0,0 +1,123 @@
+"""
+Plotly figure dicts built directly from count matrices.
+
+`stacked_bar_figure` writes the same figure as ``px.bar(gb_df, x, y='count',
+color=..., color_discrete_map=..., template='plotly_white')`` followed by the
+layout updates of the dashboard graph (titles, margins, height), but from an
+(x × stack) count matrix, without going through plotly.express' DataFrame reshaping, argument
+validation or figure object construction. `message_figure` writes the empty
+``px.scatter()`` graph showing a message. Neither imports plotly.express,
+which takes about 0.4 s to import.
+"""
+import numpy as np
+import plotly.io as pio
+
+from palette import DEFAULT_COLORS, stack_order
+
+TEMPLATE = pio.templates['plotly_white'].to_plotly_json()
+# The default template of plotly.express
+MESSAGE_TEMPLATE = pio.templates['plotly'].to_plotly_json()
+
+
+def stacked_bar_figure(counts, x_values, stack_values, x_col, stack_col, x_title, legend_title,
+                       color_map=None):
+    """
+    Build the figure dict of a stacked bar graph.
+
+    Parameters
+    ----------
+    counts : numpy.ndarray
+        Counts of shape ``(len(x_values), len(stack_values))``.
+    x_values : list
+        The x-axis categories.
+    stack_values : list
+        The color stack categories.
+    x_col : str
+        Column name of the x-axis, shown in the hover text.
+    stack_col : str
+        Column name of the color stack, shown in the hover text.
+    x_title : str
+        Title of the x-axis.
+    legend_title : str
+        Title of the legend.
+    color_map : dict, optional
+        Maps stack values to their bar color.
+
+    Returns
+    -------
+    dict
+        The figure, with one bar trace per non-empty stack value, in the order
+        px.bar gives them: by the first x category they appear in.
+    """
+    counts = np.asarray(counts)
+    non_empty = counts > 0
+    # Stack values missing from the color map take the next default colors, like in px.bar
+    colors = dict(color_map or {})
+    data = []
+    for stack_index in stack_order(counts).tolist():
+        name = str(stack_values[stack_index])
+        if stack_values[stack_index] not in colors:
+            colors[stack_values[stack_index]] = DEFAULT_COLORS[len(colors) % len(DEFAULT_COLORS)]
+        rows = np.flatnonzero(non_empty[:, stack_index])
+        data.append({
+            'alignmentgroup': 'True',
+            'hovertemplate': f'{stack_col}={name}<br>{x_col}=%{{x}}<br>count=%{{y}}<extra></extra>',
+            'legendgroup': name,
+            'marker': {'color': colors[stack_values[stack_index]], 'pattern': {'shape': ''}},
+            'name': name,
+            'offsetgroup': name,
+            'orientation': 'v',
+            'showlegend': True,
+            'textposition': 'auto',
+            'x': [x_values[i] for i in rows.tolist()],
+            'xaxis': 'x',
+            'y': counts[rows, stack_index].tolist(),
+            'yaxis': 'y',
+            'type': 'bar',
+        })
+    layout = {
+        'template': TEMPLATE,
+        'xaxis': {'anchor': 'y', 'domain': [0.0, 1.0], 'title': {'text': x_title}, 'tickmode': 'linear'},
+        'yaxis': {'anchor': 'x', 'domain': [0.0, 1.0], 'title': {'text': 'Number of Accidents'}},
+        'legend': {'title': {'text': legend_title}, 'tracegroupgap': 0},
+        'margin': {'t': 25, 'l': 0, 'r': 0, 'b': 25},
+        'barmode': 'relative',
+        'height': 400,
+    }
+    return {'data': data, 'layout': layout}
+
+
+def message_figure(text, height=300):
+    """
+    Build the figure dict of an empty graph showing a message.
+
+    Parameters
+    ----------
+    text : str
+        The message, written in red in the middle of the graph.
+    height : int, optional
+        Height of the graph in pixels.
+
+    Returns
+    -------
+    dict
+        The figure of ``px.scatter()`` with the message as an annotation,
+        hidden axes and a transparent background.
+    """
+    return {
+        'data': [{'hovertemplate': '<extra></extra>', 'legendgroup': '',
+                  'marker': {'color': '#636efa', 'symbol': 'circle'}, 'mode': 'markers', 'name': '',
+                  'orientation': 'v', 'showlegend': False, 'xaxis': 'x', 'yaxis': 'y', 'type': 'scatter'}],
+        'layout': {
+            'template': MESSAGE_TEMPLATE,
+            'xaxis': {'anchor': 'y', 'domain': [0.0, 1.0], 'visible': False},
+            'yaxis': {'anchor': 'x', 'domain': [0.0, 1.0], 'visible': False},
+            'legend': {'tracegroupgap': 0},
+            'margin': {'t': 40, 'l': 0, 'r': 0, 'b': 0},
+            'annotations': [{'font': {'color': 'red', 'size': 20}, 'showarrow': False, 'text': text,
+                             'x': 0.5, 'xref': 'paper', 'y': 0.5, 'yref': 'paper'}],
+            'plot_bgcolor': 'rgba(0,0,0,0)',
+            'paper_bgcolor': 'rgba(0,0,0,0)',
+            'height': height,
+        },
+    }
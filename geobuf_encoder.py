@@ -0,0 +1,188 @@
+"""
+Geobuf encoding of point features.
+
+Geobuf (https://github.com/mapbox/geobuf) is a protobuf encoding of GeoJSON
+that dash-leaflet's GeoJSON component decodes with ``format='geobuf'``.
+Coordinates are quantized to integers (``precision`` decimal digits) and
+written as zigzag varints, and property names are written once per payload.
+
+Like `geojson_encoder.FeatureBuffer`, `GeobufBuffer` encodes each feature once
+at startup and splices the selected ones per request. Only the small parts of
+the protobuf format needed for point features are written here, so there is
+no dependency on the protobuf or geobuf packages.
+"""
+import struct
+
+import numpy as np
+import pandas as pd
+
+from geojson_encoder import splice_rows
+
+# Field tags: (field number << 3) | wire type
+DATA_KEYS = 0x0a  # Data.keys = 1, length-delimited
+DATA_PRECISION = 0x18  # Data.precision = 3, varint
+DATA_FEATURE_COLLECTION = 0x22  # Data.feature_collection = 4, length-delimited
+COLLECTION_FEATURE = 0x0a  # FeatureCollection.features = 1, length-delimited
+FEATURE_GEOMETRY = 0x0a  # Feature.geometry = 1, length-delimited
+FEATURE_VALUE = 0x6a  # Feature.values = 13, length-delimited
+FEATURE_PROPERTIES = 0x72  # Feature.properties = 14, packed varints
+GEOMETRY_TYPE_POINT = b'\x08\x00'  # Geometry.type = 1, POINT = 0
+GEOMETRY_COORDS = 0x1a  # Geometry.coords = 3, packed sint64
+VALUE_STRING = 0x0a  # Value.string_value = 1
+VALUE_DOUBLE = 0x11  # Value.double_value = 2, 64-bit
+VALUE_POS_INT = 0x18  # Value.pos_int_value = 3, varint
+VALUE_NEG_INT = 0x20  # Value.neg_int_value = 4, varint
+VALUE_BOOL = 0x28  # Value.bool_value = 5, varint
+
+
+def varint(value):
+    """
+    Encode a non-negative integer as a protobuf varint.
+
+    Parameters
+    ----------
+    value : int
+        The integer to encode.
+
+    Returns
+    -------
+    bytes
+        The varint bytes.
+    """
+    out = bytearray()
+    while value > 0x7f:
+        out.append(value & 0x7f | 0x80)
+        value >>= 7
+    out.append(value)
+    return bytes(out)
+
+
+def zigzag(value):
+    """Map a signed integer to the unsigned integer of its sint64 encoding."""
+    return value << 1 if value >= 0 else (-value << 1) - 1
+
+
+def length_delimited(tag, payload):
+    """Encode a length-delimited field."""
+    return bytes([tag]) + varint(len(payload)) + payload
+
+
+def encode_value(value):
+    """
+    Encode a property value as a geobuf ``Value`` message.
+
+    Parameters
+    ----------
+    value : str, int, float, bool or None
+        The property value. Missing values are encoded as an empty message,
+        which decodes to ``null``.
+
+    Returns
+    -------
+    bytes
+        The message, without its field tag.
+    """
+    if value is None or (isinstance(value, float) and not np.isfinite(value)):
+        return b''
+    if isinstance(value, (bool, np.bool_)):
+        return bytes([VALUE_BOOL]) + varint(int(value))
+    if isinstance(value, (int, np.integer)):
+        value = int(value)
+        if value >= 0:
+            return bytes([VALUE_POS_INT]) + varint(value)
+        return bytes([VALUE_NEG_INT]) + varint(-value)
+    if isinstance(value, (float, np.floating)):
+        return bytes([VALUE_DOUBLE]) + struct.pack('<d', value)
+    return length_delimited(VALUE_STRING, str(value).encode())
+
+
+def value_fields(values):
+    """
+    Encode a column as ``Feature.values`` fields, one per row.
+
+    Every distinct value is encoded once and looked up by its category code.
+
+    Parameters
+    ----------
+    values : array-like
+        The column.
+
+    Returns
+    -------
+    numpy.ndarray
+        The encoded field of each row, as bytes objects.
+    """
+    values = pd.Categorical(values)
+    lookup = [length_delimited(FEATURE_VALUE, encode_value(value)) for value in values.categories.tolist()]
+    lookup.append(length_delimited(FEATURE_VALUE, b''))
+    return np.array(lookup, dtype=object)[values.codes]
+
+
+class GeobufBuffer:
+    """
+    Pre-encoded geobuf point features, spliced per row selection.
+
+    Every Feature is stored once as a ``FeatureCollection.features`` field in
+    one buffer of uint8; ``offsets[i]:offsets[i + 1]`` is the slice of row ``i``.
+
+    Parameters
+    ----------
+    lat : numpy.ndarray
+        Latitude of each point. Points with a missing coordinate cannot be
+        drawn, and are left out: their slice is empty.
+    lon : numpy.ndarray
+        Longitude of each point.
+    properties : dict
+        Maps a property name to a column with one value per point.
+    precision : int, optional
+        Number of decimal digits the coordinates are quantized to.
+    """
+
+    def __init__(self, lat, lon, properties, precision=6):
+        self.keys = list(properties)
+        self.precision = precision
+        scale = 10 ** precision
+        lat = np.asarray(lat, dtype=np.float64)
+        lon = np.asarray(lon, dtype=np.float64)
+        valid = np.isfinite(lat) & np.isfinite(lon)
+
+        geometry = [
+            length_delimited(FEATURE_GEOMETRY, GEOMETRY_TYPE_POINT + length_delimited(
+                GEOMETRY_COORDS, varint(zigzag(x)) + varint(zigzag(y))))
+            for x, y in zip(np.round(lon[valid] * scale).astype(np.int64).tolist(),
+                            np.round(lat[valid] * scale).astype(np.int64).tolist())
+        ]
+        # Every feature has every property, value i being property i
+        property_pairs = b''.join(varint(i) + varint(i) for i in range(len(self.keys)))
+        property_field = length_delimited(FEATURE_PROPERTIES, property_pairs)
+
+        columns = [geometry] + [value_fields(values)[valid] for values in properties.values()]
+        features = np.full(len(lat), b'', dtype=object)
+        features[valid] = [length_delimited(COLLECTION_FEATURE, b''.join(parts) + property_field)
+                           for parts in zip(*columns)]
+        # Held as an array so that the startup state can memory-map it
+        self.buffer = np.frombuffer(b''.join(features), dtype=np.uint8)
+        self.offsets = np.zeros(len(features) + 1, dtype=np.int64)
+        np.cumsum(np.fromiter(map(len, features), dtype=np.int64, count=len(features)),
+                  out=self.offsets[1:])
+        self.header = b''.join(length_delimited(DATA_KEYS, key.encode()) for key in self.keys) + \
+            bytes([DATA_PRECISION]) + varint(precision)
+
+    def select(self, rows):
+        """
+        Build the geobuf ``Data`` message of a row selection.
+
+        Parameters
+        ----------
+        rows : numpy.ndarray
+            Sorted positions of the rows to include.
+
+        Returns
+        -------
+        bytes
+            The encoded FeatureCollection, with the features in row order.
+        """
+        slices = splice_rows(self.buffer, self.offsets, rows)
+        size = sum(len(piece) for piece in slices)
+        return b''.join([self.header, bytes([DATA_FEATURE_COLLECTION]), varint(size), *slices])
+
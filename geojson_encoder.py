@@ -0,0 +1,208 @@
+"""
+Vectorized GeoJSON encoding of point features.
+
+Builds the FeatureCollection text straight from coordinate and property
+arrays: every column is first turned into an array of JSON literals in bulk
+(categorical values are escaped once per category), then one string template
+per feature is filled in and the features are joined. No geometry objects or
+per-feature dicts are created, and neither geopandas nor shapely is needed.
+
+Since the features never change, `FeatureBuffer` encodes each of them once
+into one contiguous buffer, and a response is then only a join of the byte
+slices of the selected rows.
+"""
+import json
+
+import numpy as np
+import pandas as pd
+
+COLLECTION_HEAD = '{"type":"FeatureCollection","features":['
+COLLECTION_TAIL = ']}'
+
+
+def float_texts(values):
+    """
+    Write every float of an array as the shortest text that reads back as it.
+
+    Parameters
+    ----------
+    values : numpy.ndarray
+        A float array. float32 values are written at their own precision, not
+        with the noise digits of their float64 conversion.
+
+    Returns
+    -------
+    list of str
+        The text of each value.
+    """
+    if values.dtype == np.float64:
+        return list(map(repr, values.tolist()))
+    return list(map(str, values))
+
+
+def json_literals(values):
+    """
+    Convert a column to an array of JSON literals.
+
+    Parameters
+    ----------
+    values : array-like
+        A numeric, boolean, categorical or string column. Missing values become
+        ``null``.
+
+    Returns
+    -------
+    numpy.ndarray
+        One JSON literal string per value.
+    """
+    if isinstance(values, pd.Series):
+        values = values.array
+    # Python's str/repr of the listed values beat numpy's astype(str)
+    if isinstance(values, np.ndarray) and values.dtype.kind in 'iu':
+        return np.array(list(map(str, values.tolist())), dtype=object)
+    if isinstance(values, np.ndarray) and values.dtype.kind == 'f':
+        return np.where(np.isfinite(values), np.array(float_texts(values), dtype=object), 'null')
+    if isinstance(values, np.ndarray) and values.dtype.kind == 'b':
+        return np.where(values, 'true', 'false')
+    values = pd.Categorical(values)
+    lookup = np.array([json.dumps(value) for value in values.categories] + ['null'], dtype=object)
+    return lookup[values.codes]
+
+
+def encode_features(lat, lon, properties, constants=None):
+    """
+    Encode points as a list of GeoJSON Feature texts.
+
+    Parameters
+    ----------
+    lat : numpy.ndarray
+        Latitude of each point. Points with a missing coordinate get a
+        ``null`` geometry.
+    lon : numpy.ndarray
+        Longitude of each point.
+    properties : dict
+        Maps a property name to a column with one value per point.
+    constants : dict, optional
+        Properties with the same value for every point.
+
+    Returns
+    -------
+    list of str
+        One Feature per point.
+    """
+    lat = np.asarray(lat)
+    lon = np.asarray(lon)
+    valid = np.isfinite(lat) & np.isfinite(lon)
+    geometry = np.full(len(lat), 'null', dtype=object)
+    geometry[valid] = list(map('{"type":"Point","coordinates":[%s,%s]}'.__mod__,
+                               zip(float_texts(lon[valid]), float_texts(lat[valid]))))
+
+    # Literal parts of the template are escaped, since it is filled with %
+    members = [f'{json.dumps(name)}:{json.dumps(value)}'.replace('%', '%%')
+               for name, value in (constants or {}).items()]
+    members += [json.dumps(name).replace('%', '%%') + ':%s' for name in properties]
+    template = '{"type":"Feature","properties":{' + ','.join(members) + '},"geometry":%s}'
+    columns = [json_literals(values) for values in properties.values()] + [geometry]
+    return list(map(template.__mod__, zip(*columns)))
+
+
+def encode_feature_collection(lat, lon, properties, constants=None):
+    """
+    Encode points as a GeoJSON FeatureCollection.
+
+    Parameters
+    ----------
+    lat : numpy.ndarray
+        Latitude of each point. Points with a missing coordinate get a
+        ``null`` geometry.
+    lon : numpy.ndarray
+        Longitude of each point.
+    properties : dict
+        Maps a property name to a column with one value per point.
+    constants : dict, optional
+        Properties with the same value for every point.
+
+    Returns
+    -------
+    bytes
+        The UTF-8 encoded FeatureCollection.
+    """
+    features = ','.join(encode_features(lat, lon, properties, constants))
+    return (COLLECTION_HEAD + features + COLLECTION_TAIL).encode()
+
+
+def splice_rows(buffer, offsets, rows):
+    """
+    Slice the fragments of the selected rows out of a fragment buffer.
+
+    Consecutive rows are returned as one slice, so a large contiguous
+    selection costs a single copy when the slices are joined.
+
+    Parameters
+    ----------
+    buffer : bytes-like
+        The fragments of all the rows, back to back.
+    offsets : numpy.ndarray
+        ``offsets[i]:offsets[i + 1]`` is the fragment of row ``i``.
+    rows : numpy.ndarray
+        Sorted positions of the selected rows.
+
+    Returns
+    -------
+    list of memoryview
+        The slices, in row order.
+    """
+    rows = np.asarray(rows, dtype=np.int64)
+    if not len(rows):
+        return []
+    breaks = np.flatnonzero(np.diff(rows) != 1) + 1
+    starts = offsets[rows[np.r_[0, breaks]]]
+    stops = offsets[rows[np.r_[breaks - 1, len(rows) - 1]] + 1]
+    buffer = memoryview(buffer)
+    return [buffer[start:stop] for start, stop in zip(starts.tolist(), stops.tolist())]
+
+
+class FeatureBuffer:
+    """
+    Pre-encoded features, spliced into a FeatureCollection per row selection.
+
+    Every Feature is stored once, followed by a comma, in a single ASCII
+    buffer of uint8; ``offsets[i]:offsets[i + 1]`` is the slice of row ``i``.
+
+    Parameters
+    ----------
+    lat : numpy.ndarray
+        Latitude of each point.
+    lon : numpy.ndarray
+        Longitude of each point.
+    properties : dict
+        Maps a property name to a column with one value per point.
+    """
+
+    def __init__(self, lat, lon, properties):
+        # json.dumps escapes non-ASCII text, so characters and bytes line up
+        features = encode_features(lat, lon, properties)
+        # Held as an array so that the startup state can memory-map it
+        self.buffer = np.frombuffer(''.join([feature + ',' for feature in features]).encode('ascii'), dtype=np.uint8)
+        self.offsets = np.zeros(len(features) + 1, dtype=np.int64)
+        np.cumsum(np.fromiter(map(len, features), dtype=np.int64, count=len(features)) + 1,
+                  out=self.offsets[1:])
+
+    def select(self, rows):
+        """
+        Build the FeatureCollection of a row selection.
+
+        Parameters
+        ----------
+        rows : numpy.ndarray
+            Sorted positions of the rows to include.
+
+        Returns
+        -------
+        bytes
+            The FeatureCollection, with the features in row order.
+        """
+        slices = splice_rows(self.buffer, self.offsets, rows)
+        if slices:
+            slices[-1] = slices[-1][:-1]  # drop the comma after the last feature
+        return b''.join([COLLECTION_HEAD.encode(), *slices, COLLECTION_TAIL.encode()])
@@ -0,0 +1,9 @@
+"""
+Gunicorn settings, read from the working directory by ``gunicorn app:server``.
+
+The app is imported once in the master, which loads the dataset and the
+startup state before forking the workers, so the workers share those pages
+instead of each loading its own copy (see `startup_state`). The number of
+workers is taken from ``WEB_CONCURRENCY`` as usual.
+"""
+preload_app = True
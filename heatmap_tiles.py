@@ -0,0 +1,265 @@
+"""
+Precomputed density heatmap tiles.
+
+Every layer (a subset of the accidents, e.g. one severity) is binned with
+`np.histogram2d` into a pyramid of 256 px Web Mercator tiles, one PNG file per
+non-empty tile, written under a cache directory next to a JSON manifest. The
+color of a bin only depends on its own count, so a tile only depends on its
+own points: the manifest records an order-independent digest of the points of
+every tile, and an update only renders the tiles whose digest changed and
+removes the tiles left without points.
+
+The PNG files are written with `zlib` alone, so there is no dependency on an
+imaging library.
+"""
+import hashlib
+import json
+import os
+import struct
+import zlib
+
+import numpy as np
+
+from vector_tiles import world_position
+
+PYRAMID_VERSION = 1
+MANIFEST_NAME = 'manifest.json'
+TILE_PIXELS = 256
+# Size of a density bin, drawn as a square of BIN_PIXELS pixels.
+BIN_PIXELS = 4
+# Bin count drawn with the full color at REFERENCE_ZOOM. Accidents lie along
+# roads, so a bin holds about twice as many of them one zoom level out.
+SATURATION_COUNT = 8
+REFERENCE_ZOOM = 12
+DEFAULT_ZOOMS = range(6, 14)
+
+# Transparent, then yellow to red with a growing opacity.
+COLOR_STOPS = np.array([
+    [0.0, 255, 255, 178, 0],
+    [0.01, 255, 255, 178, 120],
+    [0.35, 254, 204, 92, 170],
+    [0.6, 253, 141, 60, 200],
+    [0.8, 240, 59, 32, 220],
+    [1.0, 189, 0, 38, 240],
+])
+COLORMAP = np.stack([np.interp(np.linspace(0, 1, 256), COLOR_STOPS[:, 0], COLOR_STOPS[:, channel])
+                     for channel in range(1, 5)], axis=1).round().astype(np.uint8)
+
+
+def png_chunk(chunk_type, data):
+    """Encode a PNG chunk: length, type, data and CRC."""
+    return struct.pack('>I', len(data)) + chunk_type + data + \
+        struct.pack('>I', zlib.crc32(chunk_type + data) & 0xffffffff)
+
+
+def encode_png(rgba):
+    """
+    Encode an RGBA image as PNG.
+
+    Parameters
+    ----------
+    rgba : numpy.ndarray
+        uint8 array of shape ``(height, width, 4)``.
+
+    Returns
+    -------
+    bytes
+        The PNG file.
+    """
+    height, width, _ = rgba.shape
+    # Every scanline starts with its filter type, 0 (none)
+    scanlines = np.zeros((height, width * 4 + 1), dtype=np.uint8)
+    scanlines[:, 1:] = rgba.reshape(height, -1)
+    header = struct.pack('>IIBBBBB', width, height, 8, 6, 0, 0, 0)  # 8-bit RGBA
+    return b'\x89PNG\r\n\x1a\n' + png_chunk(b'IHDR', header) + \
+        png_chunk(b'IDAT', zlib.compress(scanlines.tobytes(), 6)) + png_chunk(b'IEND', b'')
+
+
+EMPTY_TILE = encode_png(np.zeros((TILE_PIXELS, TILE_PIXELS, 4), dtype=np.uint8))
+
+
+def row_digests(ids, lat, lon):
+    """
+    Hash every row to a 64-bit integer, from its id and coordinates.
+
+    Parameters
+    ----------
+    ids : numpy.ndarray
+        Integer id of each row.
+    lat, lon : numpy.ndarray
+        Coordinates of each row.
+
+    Returns
+    -------
+    numpy.ndarray
+        uint64 hashes. Their wrapping sum over a set of rows is a digest that
+        does not depend on the row order.
+    """
+    values = np.asarray(ids).astype(np.uint64) * np.uint64(0x9e3779b97f4a7c15)
+    values ^= np.asarray(lat, dtype=np.float64).view(np.uint64) * np.uint64(0xc2b2ae3d27d4eb4f)
+    values ^= np.asarray(lon, dtype=np.float64).view(np.uint64) * np.uint64(0x165667b19e3779f9)
+    # splitmix64 finalizer
+    values ^= values >> np.uint64(30)
+    values *= np.uint64(0xbf58476d1ce4e5b9)
+    values ^= values >> np.uint64(27)
+    values *= np.uint64(0x94d049bb133111eb)
+    values ^= values >> np.uint64(31)
+    return values
+
+
+def render_tile(zoom, local_x, local_y):
+    """
+    Render the density of the points of one tile.
+
+    Parameters
+    ----------
+    zoom : int
+        Zoom level of the tile.
+    local_x, local_y : numpy.ndarray
+        Pixel position of every point in the tile, in ``[0, TILE_PIXELS)``.
+
+    Returns
+    -------
+    bytes
+        The PNG tile.
+    """
+    n_bins = TILE_PIXELS // BIN_PIXELS
+    counts, _, _ = np.histogram2d(local_y, local_x, bins=n_bins, range=[[0, TILE_PIXELS], [0, TILE_PIXELS]])
+    saturation = SATURATION_COUNT * 2.0 ** (REFERENCE_ZOOM - zoom)
+    intensity = np.clip(np.log1p(counts) / np.log1p(saturation), 0, 1)
+    rgba = COLORMAP[np.ceil(intensity * 255).astype(np.intp)]
+    return encode_png(rgba.repeat(BIN_PIXELS, axis=0).repeat(BIN_PIXELS, axis=1))
+
+
+def tile_path(cache_dir, layer, z, x, y):
+    """Path of a tile file in the pyramid directory."""
+    return os.path.join(cache_dir, str(layer), str(z), str(x), f'{y}.png')
+
+
+def read_manifest(cache_dir):
+    """
+    Read the pyramid manifest.
+
+    Parameters
+    ----------
+    cache_dir : str
+        The pyramid directory.
+
+    Returns
+    -------
+    dict
+        The manifest, or an empty one if it is missing, unreadable, or was
+        written with other rendering parameters.
+    """
+    params = {'version': PYRAMID_VERSION, 'bin_pixels': BIN_PIXELS,
+              'saturation_count': SATURATION_COUNT, 'reference_zoom': REFERENCE_ZOOM}
+    try:
+        with open(os.path.join(cache_dir, MANIFEST_NAME)) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        manifest = {}
+    if manifest.get('params') != params:
+        manifest = {'params': params, 'tiles': {}}
+    return manifest
+
+
+def pyramid_digest(cache_dir):
+    """
+    Digest the pyramid manifest, which changes with the content of any tile.
+
+    Parameters
+    ----------
+    cache_dir : str
+        The pyramid directory.
+
+    Returns
+    -------
+    str or None
+        A short hex digest, or None if the pyramid has no manifest.
+    """
+    try:
+        with open(os.path.join(cache_dir, MANIFEST_NAME), 'rb') as f:
+            return hashlib.sha256(f.read()).hexdigest()[:16]
+    except OSError:
+        return None
+
+
+def _write_file(path, data, mode='wb'):
+    # Write then rename, so the server never sends a half-written file.
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, mode) as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def update_pyramid(cache_dir, lat, lon, ids, layers, zooms=DEFAULT_ZOOMS):
+    """
+    Bring the heatmap tiles of every layer up to date with the data.
+
+    Parameters
+    ----------
+    cache_dir : str
+        The pyramid directory, created if needed.
+    lat, lon : numpy.ndarray
+        Coordinates of each row. Rows with a missing coordinate are left out.
+    ids : numpy.ndarray
+        Integer id of each row, used to detect changed rows.
+    layers : dict
+        Maps a layer name, used in the tile paths, to the boolean mask of its
+        rows.
+    zooms : iterable of int, optional
+        The zoom levels of the pyramid.
+
+    Returns
+    -------
+    dict
+        Number of tiles ``rendered``, ``kept`` as they were and ``removed``.
+    """
+    manifest = read_manifest(cache_dir)
+    old_tiles = manifest['tiles']
+    new_tiles = {}
+    stats = {'rendered': 0, 'kept': 0, 'removed': 0}
+    lat = np.asarray(lat, dtype=np.float64)
+    lon = np.asarray(lon, dtype=np.float64)
+    valid = np.isfinite(lat) & np.isfinite(lon)
+    world_x, world_y = world_position(lat, lon)
+    digests = row_digests(ids, lat, lon)
+
+    for layer, mask in layers.items():
+        rows = np.flatnonzero(valid & np.asarray(mask))
+        for z in zooms:
+            pixel_x = world_x[rows] * (TILE_PIXELS << z)
+            pixel_y = world_y[rows] * (TILE_PIXELS << z)
+            tile_x = (pixel_x // TILE_PIXELS).astype(np.uint64)
+            tile_y = (pixel_y // TILE_PIXELS).astype(np.uint64)
+            keys = tile_x << np.uint64(32) | tile_y
+            order = np.argsort(keys, kind='stable')
+            keys = keys[order]
+            if not len(keys):
+                continue
+            # Each tile is a run of equal keys
+            starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+            stops = np.r_[starts[1:], len(keys)]
+            tile_digests = np.add.reduceat(digests[rows][order], starts)
+            for start, stop, digest in zip(starts.tolist(), stops.tolist(), tile_digests.tolist()):
+                x, y = int(tile_x[order[start]]), int(tile_y[order[start]])
+                name = f'{layer}/{z}/{x}/{y}'
+                new_tiles[name] = f'{digest:016x}'
+                if old_tiles.get(name) == new_tiles[name] and os.path.exists(tile_path(cache_dir, layer, z, x, y)):
+                    stats['kept'] += 1
+                    continue
+                tile_rows = order[start:stop]
+                _write_file(tile_path(cache_dir, layer, z, x, y), render_tile(
+                    z, pixel_x[tile_rows] - x * TILE_PIXELS, pixel_y[tile_rows] - y * TILE_PIXELS))
+                stats['rendered'] += 1
+
+    for name in old_tiles.keys() - new_tiles.keys():
+        try:
+            os.remove(tile_path(cache_dir, *name.split('/')))
+        except OSError:
+            pass
+        stats['removed'] += 1
+    manifest['tiles'] = new_tiles
+    _write_file(os.path.join(cache_dir, MANIFEST_NAME), json.dumps(manifest), mode='w')
+    return stats
@@ -0,0 +1,67 @@
+"""
+Colors of the values of the graph columns.
+
+The colors are the ones px.bar gives to the color stack of a graph over
+the months: values take the plotly qualitative sequence in the order of
+their first appearance, months first, values second. The order is read from
+the count cube instead of rendering figures, and the palette is saved with
+the rest of the startup state (see `startup_state`).
+"""
+import numpy as np
+
+# The plotly qualitative sequence, as written in the plotly_white template
+DEFAULT_COLORS = ['#636efa', '#EF553B', '#00cc96', '#ab63fa', '#FFA15A',
+                  '#19d3f3', '#FF6692', '#B6E880', '#FF97FF', '#FECB52']
+
+
+def stack_order(counts):
+    """
+    Order the non-empty columns of a count matrix as px.bar orders its traces.
+
+    Parameters
+    ----------
+    counts : numpy.ndarray
+        Counts of shape ``(n_x, n_stack)``, the categories of both axes sorted.
+
+    Returns
+    -------
+    numpy.ndarray
+        Indices of the non-empty stack categories, by the first x category
+        they appear in, then by their own order.
+    """
+    non_empty = np.asarray(counts) > 0
+    present = np.flatnonzero(non_empty.any(axis=0))
+    first_x = non_empty[:, present].argmax(axis=0)
+    return present[np.lexsort((present, first_x))]
+
+
+def assign_palette(cube, x_col, columns, colors=DEFAULT_COLORS):
+    """
+    Assign a color to every value of the given columns.
+
+    Parameters
+    ----------
+    cube : count_cube.CountCube
+        Counts of the dataset, with `x_col` and `columns` as dimensions.
+    x_col : str
+        The x-axis whose graphs the colors follow.
+    columns : list of str
+        The columns to color. `x_col` itself is colored in its own order.
+    colors : list of str, optional
+        The color sequence, cycled through.
+
+    Returns
+    -------
+    dict
+        Maps each column to a dict mapping each of its values to a color.
+    """
+    palette = {}
+    for col in columns:
+        if col == x_col:
+            order = np.flatnonzero(cube.counts.sum(axis=tuple(
+                axis for axis in range(cube.counts.ndim) if axis != cube.columns.index(col))))
+        else:
+            order = stack_order(cube.matrix(x_col, col))
+        values = cube.categories[col][order].tolist()
+        palette[col] = {value: colors[i % len(colors)] for i, value in enumerate(values)}
+    return palette
@@ -0,0 +1,118 @@
+"""
+Compact, URL-safe keys for a filter selection.
+
+A key holds, for every checklist column, a hex bitmask over the column's
+values (in the order of their list), optionally followed by the map-view
+bounds. Any worker holding the same value lists can decode it, so a key can
+be passed to a Flask route instead of the selection itself, e.g.
+``7f.f.3.7f.7.7f~31.9,34.7,32.2,35.0``.
+
+Map bounds change with every pixel of a pan; `snap_bounds` widens them to a
+coarse tile grid first, so nearby views share one key.
+"""
+import math
+
+# Bounds are snapped to the tiles this many zoom levels below the map's,
+# i.e. to a grid of 64 px for 256 px tiles.
+SNAP_ZOOM_OFFSET = 2
+
+
+def encode_selection(filter_values, column_values, bounds=None):
+    """
+    Encode a filter selection as a compact key.
+
+    Parameters
+    ----------
+    filter_values : dict
+        Maps a checklist column to the list of its selected values.
+    column_values : dict
+        Maps every checklist column to the list of its possible values. The
+        order of the dict and of each list defines the key layout.
+    bounds : list, optional
+        ``[[lat_ll, lon_ll], [lat_ur, lon_ur]]`` when the map-view filter is on.
+
+    Returns
+    -------
+    str
+        The selection key.
+    """
+    masks = []
+    for col, values in column_values.items():
+        selected = set(filter_values.get(col) or [])
+        mask = sum(1 << i for i, value in enumerate(values) if value in selected)
+        masks.append(f'{mask:x}')
+    key = '.'.join(masks)
+    if bounds is not None:
+        (y_ll, x_ll), (y_ur, x_ur) = bounds
+        key += '~' + ','.join(repr(float(coord)) for coord in (y_ll, x_ll, y_ur, x_ur))
+    return key
+
+
+def decode_selection(key, column_values):
+    """
+    Decode a key built by `encode_selection`.
+
+    Parameters
+    ----------
+    key : str
+        The selection key.
+    column_values : dict
+        The same column values the key was encoded with.
+
+    Returns
+    -------
+    filter_values : dict
+        Maps every checklist column to the list of its selected values.
+    bounds : list or None
+        The map-view bounds, or None if the key has none.
+
+    Raises
+    ------
+    ValueError
+        If the key is malformed.
+    """
+    masks_part, _, bounds_part = key.partition('~')
+    masks = masks_part.split('.')
+    if len(masks) != len(column_values):
+        raise ValueError(f'Expected {len(column_values)} column masks, got {len(masks)}')
+    filter_values = {}
+    for mask, (col, values) in zip(masks, column_values.items()):
+        mask = int(mask, 16)
+        filter_values[col] = [value for i, value in enumerate(values) if mask >> i & 1]
+    bounds = None
+    if bounds_part:
+        y_ll, x_ll, y_ur, x_ur = (float(coord) for coord in bounds_part.split(','))
+        bounds = [[y_ll, x_ll], [y_ur, x_ur]]
+    return filter_values, bounds
+
+
+def snap_bounds(bounds, zoom, zoom_offset=SNAP_ZOOM_OFFSET):
+    """
+    Widen map bounds to the Web Mercator tile grid of a deeper zoom level.
+
+    Parameters
+    ----------
+    bounds : list
+        ``[[lat_ll, lon_ll], [lat_ur, lon_ur]]``.
+    zoom : int
+        The zoom level of the map.
+    zoom_offset : int, optional
+        The grid is the one of the tiles at ``zoom + zoom_offset``.
+
+    Returns
+    -------
+    list
+        The smallest grid-aligned bounds holding `bounds`.
+    """
+    scale = 2 ** (int(zoom) + zoom_offset)
+    (y_ll, x_ll), (y_ur, x_ur) = bounds
+
+    def tile_y(lat):
+        lat = math.radians(max(min(lat, 85.0511287798066), -85.0511287798066))
+        return (1 - math.log(math.tan(lat) + 1 / math.cos(lat)) / math.pi) / 2 * scale
+
+    def tile_lat(y):
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * y / scale))))
+
+    return [[tile_lat(math.ceil(tile_y(y_ll))), math.floor((x_ll + 180) / 360 * scale) / scale * 360 - 180],
+            [tile_lat(math.floor(tile_y(y_ur))), math.ceil((x_ur + 180) / 360 * scale) / scale * 360 - 180]]
@@ -0,0 +1,145 @@
+"""
+Uniform grid index over the accident coordinates.
+
+Rows are bucketed into a regular lat/lon grid and stored sorted by cell, so
+each cell is a contiguous slice of row positions. A bounds query only visits
+the cells overlapping the viewport: cells whose points all lie inside the
+bounds are taken as a whole, and only the points of the remaining boundary
+cells are compared with the bounds. Viewports covering a large share of the
+rows fall back to a sequential scan, which is faster than gathering them.
+"""
+import numpy as np
+
+ROWS_PER_CELL = 16
+MAX_CELLS_PER_AXIS = 1024
+# Above this share of candidate rows, a sequential scan beats the index.
+SCAN_FRACTION = 0.2
+
+
+def concat_ranges(starts, stops):
+    """
+    Concatenate ``arange(start, stop)`` for every pair, without a Python loop.
+
+    Parameters
+    ----------
+    starts : numpy.ndarray
+        Start of each range.
+    stops : numpy.ndarray
+        End (exclusive) of each range.
+
+    Returns
+    -------
+    numpy.ndarray
+        The concatenated int64 ranges.
+    """
+    lengths = stops - starts
+    keep = lengths > 0
+    starts, lengths = starts[keep], lengths[keep]
+    if not len(lengths):
+        return np.empty(0, dtype=np.int64)
+    offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+    return offsets + np.arange(lengths.sum())
+
+
+class GridIndex:
+    """
+    Grid of lat/lon cells, each holding a contiguous slice of row positions.
+
+    Rows with a missing coordinate are not indexed, as they can never fall in
+    a viewport.
+
+    Parameters
+    ----------
+    lat : numpy.ndarray
+        Latitude of each row, float32 or float64. The columns are kept as they
+        are, e.g. memory-mapped, and the positions are computed in float64.
+    lon : numpy.ndarray
+        Longitude of each row.
+    cells_per_axis : int, optional
+        Grid resolution. By default about `ROWS_PER_CELL` rows per cell.
+    """
+
+    def __init__(self, lat, lon, cells_per_axis=None):
+        lat = np.asarray(lat)
+        lon = np.asarray(lon)
+        self.n_rows = len(lat)
+        self.row_lat, self.row_lon = lat, lon
+        valid_rows = np.flatnonzero(np.isfinite(lat) & np.isfinite(lon))
+        valid_lat = lat[valid_rows].astype(np.float64)
+        valid_lon = lon[valid_rows].astype(np.float64)
+        if cells_per_axis is None:
+            cells_per_axis = int(np.clip(np.sqrt(len(valid_rows) / ROWS_PER_CELL),
+                                         1, MAX_CELLS_PER_AXIS))
+        self.n = cells_per_axis
+        if len(valid_rows):
+            self.lat0, self.lon0 = valid_lat.min(), valid_lon.min()
+            lat_span = valid_lat.max() - self.lat0
+            lon_span = valid_lon.max() - self.lon0
+        else:
+            self.lat0 = self.lon0 = lat_span = lon_span = 0.0
+        self.lat_step = lat_span / self.n or 1.0
+        self.lon_step = lon_span / self.n or 1.0
+
+        cells = self._cell_of(valid_lat, valid_lon)
+        order = np.argsort(cells, kind='stable')
+        sorted_cells = cells[order]
+        self.rows = valid_rows[order]
+        self.lat = lat[self.rows]
+        self.lon = lon[self.rows]
+        self.cell_starts = np.searchsorted(sorted_cells, np.arange(self.n * self.n + 1))
+
+        # Actual extent of the points in each cell, used to tell contained
+        # cells from boundary cells without any rounding issue.
+        n_cells = self.n * self.n
+        self.lat_min = np.full(n_cells, np.inf)
+        self.lat_max = np.full(n_cells, -np.inf)
+        self.lon_min = np.full(n_cells, np.inf)
+        self.lon_max = np.full(n_cells, -np.inf)
+        non_empty = np.flatnonzero(np.diff(self.cell_starts) > 0)
+        if len(non_empty):
+            starts = self.cell_starts[non_empty]
+            self.lat_min[non_empty] = np.minimum.reduceat(self.lat, starts)
+            self.lat_max[non_empty] = np.maximum.reduceat(self.lat, starts)
+            self.lon_min[non_empty] = np.minimum.reduceat(self.lon, starts)
+            self.lon_max[non_empty] = np.maximum.reduceat(self.lon, starts)
+
+    def _axis_cell(self, values, origin, step):
+        return np.clip(np.floor((values - origin) / step), 0, self.n - 1).astype(np.int64)
+
+    def _cell_of(self, lat, lon):
+        return self._axis_cell(lat, self.lat0, self.lat_step) * self.n + \
+            self._axis_cell(lon, self.lon0, self.lon_step)
+
+    def query(self, bounds):
+        """
+        Return the rows strictly inside the bounds.
+
+        Parameters
+        ----------
+        bounds : list
+            ``[[lat_ll, lon_ll], [lat_ur, lon_ur]]``, as given by ``dl.Map.bounds``.
+
+        Returns
+        -------
+        numpy.ndarray
+            Sorted row positions.
+        """
+        # float64 bounds, so that float32 coordinates are compared in float64
+        (y_ll, x_ll), (y_ur, x_ur) = np.asarray(bounds, dtype=np.float64)
+        i0, i1 = self._axis_cell(np.array([y_ll, y_ur]), self.lat0, self.lat_step)
+        j0, j1 = self._axis_cell(np.array([x_ll, x_ur]), self.lon0, self.lon_step)
+        cells = (np.arange(i0, i1 + 1)[:, None] * self.n + np.arange(j0, j1 + 1)).ravel()
+        n_candidates = (self.cell_starts[cells + 1] - self.cell_starts[cells]).sum()
+        if n_candidates > SCAN_FRACTION * self.n_rows:
+            return np.flatnonzero((self.row_lat > y_ll) & (self.row_lat < y_ur) & (
+                self.row_lon > x_ll) & (self.row_lon < x_ur))
+
+        contained = (self.lat_min[cells] > y_ll) & (self.lat_max[cells] < y_ur) & (
+            self.lon_min[cells] > x_ll) & (self.lon_max[cells] < x_ur)
+        inner = cells[contained]
+        boundary = cells[~contained]
+        inner_pos = concat_ranges(self.cell_starts[inner], self.cell_starts[inner + 1])
+        boundary_pos = concat_ranges(self.cell_starts[boundary], self.cell_starts[boundary + 1])
+        boundary_pos = boundary_pos[(self.lat[boundary_pos] > y_ll) & (self.lat[boundary_pos] < y_ur) & (
+            self.lon[boundary_pos] > x_ll) & (self.lon[boundary_pos] < x_ur)]
+        return np.sort(self.rows[np.concatenate([inner_pos, boundary_pos])])
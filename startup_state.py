@@ -0,0 +1,310 @@
+"""
+Derived state of the dataset, built once and loaded by every worker.
+
+The indexes, the encoded points, the palette and the other module-level state
+of the app only depend on the dataset, on the code of the modules building
+them and on a few settings. They are built once into a single pickle file,
+next to a JSON manifest recording the key it was built for: a hash of the
+dataset, of the source of those modules, of the numpy and pandas versions and
+of the settings. A worker whose key matches the manifest loads the pickle, in
+a few ms; otherwise, or if the pickle cannot be read, it builds the state and
+writes it for the next workers.
+
+The arrays, which are nearly all of the state, are kept out of the pickle in
+a buffer file that every worker memory-maps read-only: the OS keeps a single
+copy of them in its page cache, however many workers run. The arrays that
+are columns of the dataset, like the coordinates or the categorical codes
+the indexes count over, are not copied at all: the pickle refers to their
+file in the column store (see `data_store`), which is mapped in their place,
+so the indexes run directly on the stored columns. Under gunicorn,
+``preload_app`` (see ``gunicorn.conf.py``) also loads the state once in the
+master, before the workers are forked.
+
+The density heatmap pyramid is brought up to date when the state is built,
+and left as it is when the state is loaded, unless it has gone missing.
+
+Build step, e.g. before starting the workers: ``python startup_state.py``
+"""
+import hashlib
+import io
+import json
+import mmap
+import os
+import pickle
+
+import numpy as np
+import pandas as pd
+
+import heatmap_tiles
+from bitmap_index import BitmapIndex
+from cluster_index import ClusterIndex
+from count_cube import CountCube
+from data_store import load_column, stored_columns
+from geobuf_encoder import GeobufBuffer
+from geojson_encoder import FeatureBuffer
+from palette import assign_palette
+from spatial_index import GridIndex
+from vector_tiles import VectorTiles
+
+STATE_VERSION = 3
+STATE_NAME = 'startup_state.pkl'
+BUFFERS_NAME = 'startup_state.bin'
+# Alignment of the arrays in the buffer file
+BUFFER_ALIGNMENT = 64
+MANIFEST_NAME = 'startup_state.json'
+# Modules whose code decides the content of the state
+STATE_MODULES = ['startup_state', 'bitmap_index', 'cluster_index', 'count_cube', 'data_store', 'geobuf_encoder',
+                 'geojson_encoder', 'heatmap_tiles', 'palette', 'spatial_index', 'vector_tiles']
+
+
+def _array_key(values):
+    interface = values.__array_interface__
+    return interface['data'][0], interface['shape'], interface['strides'], interface['typestr']
+
+
+class _StatePickler(pickle.Pickler):
+    """Pickler writing the stored columns of the dataset as references to their file."""
+
+    def __init__(self, file, columns, **kwargs):
+        super().__init__(file, **kwargs)
+        self.columns = {_array_key(values): col for col, values in columns.items()}
+
+    def persistent_id(self, obj):
+        if isinstance(obj, np.ndarray):
+            return self.columns.get(_array_key(obj))
+        return None
+
+
+class _StateUnpickler(pickle.Unpickler):
+    """Unpickler mapping the referenced columns from the column store."""
+
+    def __init__(self, file, cache_dir, **kwargs):
+        super().__init__(file, **kwargs)
+        self.cache_dir = cache_dir
+        self.columns = {}
+
+    def persistent_load(self, col):
+        if col not in self.columns:
+            self.columns[col] = load_column(self.cache_dir, col)
+        return self.columns[col]
+
+
+def code_sha256(modules=STATE_MODULES):
+    """Hash the source of the modules building the state, or of other `modules` of the app."""
+    digest = hashlib.sha256()
+    module_dir = os.path.dirname(os.path.abspath(__file__))
+    for name in modules:
+        with open(os.path.join(module_dir, f'{name}.py'), 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def state_key(source_sha256, params):
+    """
+    Compute the key of the state of a dataset.
+
+    Parameters
+    ----------
+    source_sha256 : str
+        Hash of the dataset.
+    params : dict
+        The settings of the state, see `build_state`.
+
+    Returns
+    -------
+    str
+        Hex digest of the state version, the dataset, the code, the numpy and
+        pandas versions and the settings.
+    """
+    # The pickle holds numpy and pandas objects, which other versions may not read back
+    document = {'version': STATE_VERSION, 'source_sha256': source_sha256, 'code_sha256': code_sha256(),
+                'numpy': np.__version__, 'pandas': pd.__version__, 'params': params}
+    return hashlib.sha256(json.dumps(document, sort_keys=True).encode()).hexdigest()
+
+
+def build_state(df, params):
+    """
+    Build the derived state of the dataset.
+
+    Parameters
+    ----------
+    df : pandas.DataFrame
+        The accidents.
+    params : dict
+        The settings: the ``graph_columns``, the ``filter_columns`` (the
+        checklists), the ``point_properties`` sent with the map points, the
+        ``palette_columns`` to color and the ``palette_x_col`` whose graphs the
+        colors follow, the ``env_map_zoom``, the ``lod_point_zoom`` and the
+        ``lod_cell_pixels``.
+
+    Returns
+    -------
+    dict
+        The state, by the names the app gives it.
+    """
+    filter_columns = params['filter_columns']
+    # The stored float32 columns: the indexes keep them as they are, and only
+    # cast the rows they gather to float64
+    lat, lon = df['lat'].values, df['lon'].values
+    count_cube = CountCube(df, params['graph_columns'])
+    state = {
+        # Values of every checklist, in order of appearance
+        'col_unique_values_dict': {col: df[col].unique().tolist() for col in filter_columns},
+        'filter_index': BitmapIndex(df, filter_columns),
+        'spatial_index': GridIndex(lat, lon),
+        'count_cube': count_cube,
+        'col_values_color': assign_palette(count_cube, params['palette_x_col'], params['palette_columns']),
+        'env_clusters': ClusterIndex(lat, lon, count_cube, zooms=[params['env_map_zoom']]),
+        'lod_cells': ClusterIndex(lat, lon, count_cube, zooms=range(0, params['lod_point_zoom']),
+                                  cell_pixels=params['lod_cell_pixels']),
+        'point_features': FeatureBuffer(lat, lon, {col: df[col].values for col in params['point_properties']}),
+        'point_geobuf': GeobufBuffer(lat, lon, {col: df[col].values for col in params['point_properties']},
+                                     precision=6),
+        'point_tiles': VectorTiles(lat, lon, {col: df[col].values for col in params['graph_columns']},
+                                   ids=df['pk_teuna_fikt'].values),
+    }
+    return state
+
+
+def update_heatmap(df, cache_dir, state):
+    """
+    Bring the density heatmap pyramid of the dataset up to date.
+
+    Parameters
+    ----------
+    df : pandas.DataFrame
+        The accidents.
+    cache_dir : str
+        The dataset artifact directory, holding the pyramid in ``heatmap/``.
+    state : dict
+        The state, as returned by `build_state`.
+    """
+    # One heatmap layer per severity, selected on the codes of the column
+    severities = state['col_unique_values_dict']['HUMRAT_TEUNA']
+    count_cube = state['count_cube']
+    codes, categories = count_cube.codes['HUMRAT_TEUNA'], count_cube.categories['HUMRAT_TEUNA']
+    heatmap_tiles.update_pyramid(os.path.join(cache_dir, 'heatmap'), df['lat'].values, df['lon'].values,
+                                 df['pk_teuna_fikt'].values,
+                                 {str(i): codes == categories.get_loc(value) for i, value in enumerate(severities)})
+
+
+def save_state(cache_dir, key, state, columns=None):
+    """
+    Write the state and its manifest.
+
+    The arrays are written out of band, back to back in one buffer file, and
+    the pickle only refers to them.
+
+    Parameters
+    ----------
+    cache_dir : str
+        The dataset artifact directory.
+    key : str
+        The key of the state, see `state_key`.
+    state : dict
+        The state, as returned by `build_state`.
+    columns : dict, optional
+        The stored columns of the dataset, as returned by
+        `data_store.stored_columns`. The arrays of the state that are one of
+        them are written as a reference to their file instead.
+    """
+    buffers = []
+    data = io.BytesIO()
+    _StatePickler(data, columns or {}, protocol=5, buffer_callback=buffers.append).dump(state)
+    # Write then rename, the manifest last, so a reader never sees a
+    # manifest matching a half-written state.
+    offsets = []
+    path = os.path.join(cache_dir, BUFFERS_NAME)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'wb') as f:
+        for buffer in buffers:
+            f.write(bytes(-f.tell() % BUFFER_ALIGNMENT))
+            view = buffer.raw()
+            offsets.append([f.tell(), view.nbytes])
+            f.write(view)
+    os.replace(tmp_path, path)
+    path = os.path.join(cache_dir, STATE_NAME)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(data.getbuffer())
+    os.replace(tmp_path, path)
+    path = os.path.join(cache_dir, MANIFEST_NAME)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump({'version': STATE_VERSION, 'key': key, 'buffers': offsets}, f)
+    os.replace(tmp_path, path)
+
+
+def load_state(cache_dir, key):
+    """
+    Load the state built for a key.
+
+    The arrays of the state are read-only views of the memory-mapped buffer
+    file or of the column store, so the workers share their pages.
+
+    Parameters
+    ----------
+    cache_dir : str
+        The dataset artifact directory.
+    key : str
+        The key of the current state, see `state_key`.
+
+    Returns
+    -------
+    dict or None
+        The state, or None if there is none for this key or it cannot be read.
+    """
+    try:
+        with open(os.path.join(cache_dir, MANIFEST_NAME)) as f:
+            manifest = json.load(f)
+        if manifest.get('version') != STATE_VERSION or manifest.get('key') != key:
+            return None
+        with open(os.path.join(cache_dir, BUFFERS_NAME), 'rb') as f:
+            mapped = memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)) \
+                if manifest['buffers'] else memoryview(b'')
+        buffers = [mapped[start:start + size] for start, size in manifest['buffers']]
+        with open(os.path.join(cache_dir, STATE_NAME), 'rb') as f:
+            return _StateUnpickler(f, cache_dir, buffers=buffers).load()
+    except Exception:
+        # Unpickling can fail in many ways (AttributeError, ImportError,
+        # TypeError...) on a stale or damaged state, which is then rebuilt
+        return None
+
+
+def load_or_build_state(df, cache_dir, source_sha256, params):
+    """
+    Load the state of the dataset, building and saving it if it is missing or stale.
+
+    The heatmap pyramid is updated with a new state, and rebuilt if it is missing.
+
+    Parameters
+    ----------
+    df : pandas.DataFrame
+        The accidents.
+    cache_dir : str
+        The dataset artifact directory.
+    source_sha256 : str
+        Hash of the dataset.
+    params : dict
+        The settings, see `build_state`.
+
+    Returns
+    -------
+    dict
+        The state.
+    """
+    key = state_key(source_sha256, params)
+    state = load_state(cache_dir, key)
+    if state is None:
+        state = build_state(df, params)
+        save_state(cache_dir, key, state, stored_columns(df))
+        update_heatmap(df, cache_dir, state)
+    elif heatmap_tiles.pyramid_digest(os.path.join(cache_dir, 'heatmap')) is None:
+        # The pyramid is not part of the state, and may be deleted on its own
+        update_heatmap(df, cache_dir, state)
+    return state
+
+
+if __name__ == '__main__':
+    # Importing the app loads the state, or builds it when it is missing or stale
+    import app  # noqa: F401
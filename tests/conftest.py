@@ -0,0 +1,23 @@
+"""
+Test configuration: puts the repository and the benchmark helpers on the path,
+and builds the accidents table the tests share.
+
+Usage: python -m pytest tests
+"""
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks'))
+
+import synthetic  # noqa: E402, F401, puts the repository on the path
+
+
+@pytest.fixture(scope='session')
+def accidents():
+    """A resampled accidents table, with a few rows missing their coordinates, as in the CSV."""
+    df = synthetic.make_accidents(3000, seed=7)
+    df.loc[[3, 4, 1000], ['lat', 'lon']] = np.nan
+    return df
@@ -0,0 +1,74 @@
+"""
+A minimal protobuf reader, decoding the messages of the hand-written encoders.
+
+It only knows the wire format, not the schemas: the tests pick the fields of
+a message by their number.
+"""
+import struct
+
+
+def read_varint(data, pos):
+    """Read the varint at `pos`, returning it and the position after it."""
+    value = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7f) << shift
+        shift += 7
+        if byte < 0x80:
+            return value, pos
+
+
+def unzigzag(value):
+    """Map the unsigned integer of a sint64 encoding back to the signed integer."""
+    return (value >> 1) ^ -(value & 1)
+
+
+def read_fields(data):
+    """
+    Decode the fields of a message.
+
+    Parameters
+    ----------
+    data : bytes
+        The message.
+
+    Returns
+    -------
+    list of tuple
+        ``(field number, value)`` pairs, in order: varints as int, 64-bit
+        fields as float and length-delimited fields as bytes.
+    """
+    fields = []
+    pos = 0
+    while pos < len(data):
+        key, pos = read_varint(data, pos)
+        number, wire_type = key >> 3, key & 7
+        if wire_type == 0:
+            value, pos = read_varint(data, pos)
+        elif wire_type == 1:
+            value = struct.unpack_from('<d', data, pos)[0]
+            pos += 8
+        elif wire_type == 2:
+            size, pos = read_varint(data, pos)
+            value = bytes(data[pos:pos + size])
+            pos += size
+        else:
+            raise ValueError(f'unexpected wire type {wire_type}')
+        fields.append((number, value))
+    return fields
+
+
+def field_values(fields, number):
+    """The values of every field `number` of the decoded fields."""
+    return [value for field_number, value in fields if field_number == number]
+
+
+def read_packed(data):
+    """Decode a packed repeated varint field."""
+    values = []
+    pos = 0
+    while pos < len(data):
+        value, pos = read_varint(data, pos)
+        values.append(value)
+    return values
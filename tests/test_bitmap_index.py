@@ -0,0 +1,47 @@
+"""
+`BitmapIndex.select` against the pandas ``isin`` filters it replaces.
+"""
+import numpy as np
+import pytest
+
+from bitmap_index import BitmapIndex
+
+COLUMNS = ['SUG_DEREH', 'SUG_YOM', 'YOM_LAYLA', 'YOM_BASHAVUA', 'HUMRAT_TEUNA', 'PNE_KVISH']
+
+
+def random_filters(df, rng):
+    """Keep a random subset of the values of every column, sometimes none or an unknown one."""
+    filter_values = {}
+    for col in COLUMNS:
+        values = df[col].unique().tolist()
+        filter_values[col] = [value for value in values if rng.random() < 0.7]
+    filter_values[COLUMNS[0]].append('not a value')
+    return filter_values
+
+
+def isin_rows(df, filter_values):
+    mask = np.ones(len(df), dtype=bool)
+    for col, values in filter_values.items():
+        mask &= df[col].isin(values or []).to_numpy()
+    return np.flatnonzero(mask)
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_select_matches_isin(accidents, seed):
+    rng = np.random.default_rng(seed)
+    index = BitmapIndex(accidents, COLUMNS)
+    filter_values = random_filters(accidents, rng)
+    expected = isin_rows(accidents, filter_values)
+    np.testing.assert_array_equal(index.select(filter_values), expected)
+    assert index.count(filter_values) == len(expected)
+
+    candidates = np.flatnonzero(rng.random(len(accidents)) < 0.3)
+    np.testing.assert_array_equal(index.select(filter_values, rows=candidates),
+                                  np.intersect1d(candidates, expected))
+
+
+def test_select_edge_cases(accidents):
+    index = BitmapIndex(accidents, COLUMNS)
+    np.testing.assert_array_equal(index.select({}), np.arange(len(accidents)))
+    assert len(index.select({'HUMRAT_TEUNA': []})) == 0
+    assert len(index.select({'HUMRAT_TEUNA': None})) == 0
@@ -0,0 +1,62 @@
+"""
+Check that the stale-view drop of one callback never drops the updates of another.
+
+Every server callback keeps its own record of the latest main map view of a
+tab (see `claim_view`). The requests are posted to ``/_dash-update-component``
+with the Flask test client, in the order they reach a busy server.
+"""
+import json
+import uuid
+
+import pytest
+
+from synthetic import callback_body
+import app
+
+VIEW = {'bounds': [[31.95, 34.72], [32.12, 34.95]], 'zoom': 12}
+
+
+@pytest.fixture
+def client():
+    app.cache.clear()
+    return app.server.test_client()
+
+
+@pytest.fixture
+def dependencies(client):
+    """The server callbacks, by their first output."""
+    return {dependency['output'].strip('.').split('.')[0]: dependency
+            for dependency in json.loads(client.get('/_dash-dependencies').data)
+            if dependency.get('clientside_function') is None}
+
+
+def post(client, dependency, values, changed):
+    return client.post('/_dash-update-component', json=callback_body(dependency, values, changed)).status_code
+
+
+def values_at(session, seq, filter_bounds):
+    values = {'x_axis_dropdown.value': 'Month', 'color_stack_dropdown.value': 'Savirity of Accident',
+              'filter_map_view.value': filter_bounds, 'points_geojson.hideout': app.hide_out_dict,
+              'points_url_store.data': app.initial_points_url, 'graph_structure_store.data': None,
+              'map_view_store.data': dict(VIEW, seq=seq, session=session)}
+    for i, label in enumerate(app.non_numerical_labels):
+        values[f'filter_{i + 1}_checklist.value'] = list(app.labels_unique_values_dict[label])
+    return values
+
+
+@pytest.mark.parametrize('callback', ['contextual_graph', 'points_env_geojson'])
+def test_toggle_after_a_pan_with_the_filter_off(client, dependencies, callback):
+    # The pan (view 2) reaches the main map before a toggle made at view 1
+    session = uuid.uuid4().hex
+    post(client, dependencies['points_url_store'], values_at(session, 2, None), ['map_view_store.data'])
+    toggled = values_at(session, 1, None)
+    toggled['filter_1_checklist.value'] = toggled['filter_1_checklist.value'][1:]
+    assert post(client, dependencies[callback], toggled, ['filter_1_checklist.value']) == 200
+
+
+def test_stale_view_with_the_filter_on(client, dependencies):
+    # The graph at view 2 reaches the server before the graph at view 1
+    session = uuid.uuid4().hex
+    graph = dependencies['contextual_graph']
+    assert post(client, graph, values_at(session, 2, ['Filter Map-view']), ['map_view_store.data']) == 200
+    assert post(client, graph, values_at(session, 1, ['Filter Map-view']), ['map_view_store.data']) == 204
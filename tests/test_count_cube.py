@@ -0,0 +1,46 @@
+"""
+`CountCube` against the ``groupby().size()`` counts it replaces.
+"""
+import numpy as np
+import pytest
+
+from count_cube import CountCube
+
+COLUMNS = ['HODESH_TEUNA', 'SUG_DEREH', 'SUG_YOM', 'YOM_LAYLA', 'YOM_BASHAVUA', 'HUMRAT_TEUNA', 'PNE_KVISH']
+PAIRS = [('HODESH_TEUNA', 'HUMRAT_TEUNA'), ('SUG_DEREH', 'PNE_KVISH'), ('PNE_KVISH', 'HODESH_TEUNA')]
+
+
+def groupby_counts(cube, df, x_col, color_stack_col):
+    """The counts of ``df.groupby().size()``, laid out like `CountCube.matrix`."""
+    counts = df.groupby([x_col, color_stack_col]).size()
+    counts = counts.reindex(
+        [(x, color) for x in cube.categories[x_col] for color in cube.categories[color_stack_col]], fill_value=0)
+    return counts.to_numpy().reshape(len(cube.categories[x_col]), len(cube.categories[color_stack_col]))
+
+
+@pytest.mark.parametrize('x_col, color_stack_col', PAIRS)
+def test_matrix_matches_groupby(accidents, x_col, color_stack_col):
+    cube = CountCube(accidents, COLUMNS)
+    np.testing.assert_array_equal(cube.matrix(x_col, color_stack_col),
+                                  groupby_counts(cube, accidents, x_col, color_stack_col))
+
+    rng = np.random.default_rng(0)
+    for i in range(5):
+        # Filters on the plotted columns and on the summed out ones
+        filter_values = {col: [value for value in accidents[col].unique().tolist() if rng.random() < 0.6]
+                         for col in COLUMNS[1:]}
+        if i == 0:
+            filter_values['YOM_LAYLA'] = []  # nothing selected
+        mask = np.ones(len(accidents), dtype=bool)
+        for col, values in filter_values.items():
+            mask &= accidents[col].isin(values).to_numpy()
+        np.testing.assert_array_equal(cube.matrix(x_col, color_stack_col, filter_values),
+                                      groupby_counts(cube, accidents[mask], x_col, color_stack_col))
+
+
+@pytest.mark.parametrize('x_col, color_stack_col', PAIRS)
+def test_rows_matrix_matches_groupby(accidents, x_col, color_stack_col):
+    cube = CountCube(accidents, COLUMNS)
+    rows = np.flatnonzero(np.random.default_rng(1).random(len(accidents)) < 0.4)
+    np.testing.assert_array_equal(cube.rows_matrix(x_col, color_stack_col, rows),
+                                  groupby_counts(cube, accidents.iloc[rows], x_col, color_stack_col))
@@ -0,0 +1,81 @@
+"""
+Round trip of `GeobufBuffer`: its payload decoded back against the table.
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from protobuf import field_values, read_fields, read_packed, unzigzag
+from geobuf_encoder import GeobufBuffer, encode_value
+
+PROPERTIES = ['pk_teuna_fikt', 'HODESH_TEUNA', 'SUG_DEREH', 'HUMRAT_TEUNA']
+
+
+def decode_value(message):
+    """Decode a geobuf ``Value`` message; an empty one is null."""
+    fields = read_fields(message)
+    if not fields:
+        return None
+    (number, value), = fields
+    return {1: lambda: value.decode(), 2: lambda: value, 3: lambda: value, 4: lambda: -value,
+            5: lambda: bool(value)}[number]()
+
+
+def decode(data):
+    """Decode a geobuf ``Data`` message of points into its keys, precision and features."""
+    fields = read_fields(data)
+    keys = [key.decode() for key in field_values(fields, 1)]
+    precision, = field_values(fields, 3)
+    collection, = field_values(fields, 4)
+    features = []
+    for feature in field_values(read_fields(collection), 1):
+        feature = read_fields(feature)
+        geometry, = field_values(feature, 1)
+        geometry = read_fields(geometry)
+        assert field_values(geometry, 1) == [0]  # POINT
+        coords, = field_values(geometry, 3)
+        values = [decode_value(value) for value in field_values(feature, 13)]
+        pairs, = field_values(feature, 14)
+        pairs = read_packed(pairs)
+        properties = {keys[key]: values[value] for key, value in zip(pairs[::2], pairs[1::2])}
+        features.append(([unzigzag(coord) for coord in read_packed(coords)], properties))
+    return keys, precision, features
+
+
+@pytest.mark.parametrize('precision', [6, 5])
+def test_select_round_trip(accidents, precision):
+    df = accidents
+    buffer = GeobufBuffer(df['lat'].values, df['lon'].values, {col: df[col].values for col in PROPERTIES},
+                          precision=precision)
+    rows = np.arange(0, len(df), 3)
+    keys, decoded_precision, features = decode(buffer.select(rows))
+
+    assert keys == PROPERTIES
+    assert decoded_precision == precision
+    # The rows without coordinates are left out
+    expected_rows = rows[np.isfinite(df['lat'].values[rows]) & np.isfinite(df['lon'].values[rows])]
+    assert len(expected_rows) < len(rows)
+    assert len(features) == len(expected_rows)
+    scale = 10 ** precision
+    for row, expected, ((x, y), properties) in zip(expected_rows.tolist(),
+                                                   df[PROPERTIES].iloc[expected_rows].to_dict('records'), features):
+        assert abs(x / scale - df['lon'][row]) <= 0.5 / scale + 1e-12
+        assert abs(y / scale - df['lat'][row]) <= 0.5 / scale + 1e-12
+        assert properties == expected
+
+
+def test_empty_selection(accidents):
+    buffer = GeobufBuffer(accidents['lat'].values, accidents['lon'].values,
+                          {'HODESH_TEUNA': accidents['HODESH_TEUNA'].values})
+    keys, _, features = decode(buffer.select(np.array([], dtype=np.int64)))
+    assert keys == ['HODESH_TEUNA']
+    assert features == []
+
+
+@pytest.mark.parametrize('value', ['חג', 0, 7, -3, 2 ** 40, 1.25, True, None, float('nan')])
+def test_encode_value(value):
+    decoded = decode_value(encode_value(value))
+    if value is None or pd.isna(value):
+        assert decoded is None
+    else:
+        assert decoded == value and type(decoded) is type(value)
@@ -0,0 +1,51 @@
+"""
+Checks of the PNG files `heatmap_tiles` writes without an imaging library.
+"""
+import struct
+import zlib
+
+import numpy as np
+
+import heatmap_tiles
+
+
+def read_png(data):
+    """Decode a non-interlaced 8-bit RGBA PNG of unfiltered scanlines, checking every chunk."""
+    assert data[:8] == b'\x89PNG\r\n\x1a\n'
+    chunks = []
+    pos = 8
+    while pos < len(data):
+        size, = struct.unpack_from('>I', data, pos)
+        chunk_type, payload = data[pos + 4:pos + 8], data[pos + 8:pos + 8 + size]
+        crc, = struct.unpack_from('>I', data, pos + 8 + size)
+        assert crc == zlib.crc32(chunk_type + payload) & 0xffffffff
+        chunks.append((chunk_type, payload))
+        pos += 12 + size
+    assert [chunk_type for chunk_type, _ in chunks] == [b'IHDR', b'IDAT', b'IEND']
+    width, height, depth, color_type, compression, filtering, interlace = struct.unpack('>IIBBBBB', chunks[0][1])
+    assert (depth, color_type, compression, filtering, interlace) == (8, 6, 0, 0, 0)
+    scanlines = np.frombuffer(zlib.decompress(chunks[1][1]), dtype=np.uint8).reshape(height, width * 4 + 1)
+    assert not scanlines[:, 0].any()  # filter type 0
+    return scanlines[:, 1:].reshape(height, width, 4)
+
+
+def test_encode_png_round_trip():
+    rgba = np.random.default_rng(0).integers(0, 256, (5, 7, 4), dtype=np.uint8)
+    np.testing.assert_array_equal(read_png(heatmap_tiles.encode_png(rgba)), rgba)
+
+
+def test_empty_tile():
+    rgba = read_png(heatmap_tiles.EMPTY_TILE)
+    assert rgba.shape == (heatmap_tiles.TILE_PIXELS, heatmap_tiles.TILE_PIXELS, 4)
+    assert not rgba.any()
+
+
+def test_render_tile():
+    # Three points in the top left bin, one in the bottom right one
+    local = np.array([1.0, 2.0, 3.0, 255.0])
+    rgba = read_png(heatmap_tiles.render_tile(heatmap_tiles.REFERENCE_ZOOM, local, local))
+    bin_pixels = heatmap_tiles.BIN_PIXELS
+    assert rgba.shape == (heatmap_tiles.TILE_PIXELS, heatmap_tiles.TILE_PIXELS, 4)
+    assert (rgba[:bin_pixels, :bin_pixels] == rgba[0, 0]).all()
+    assert rgba[0, 0, 3] > rgba[-1, -1, 3] > 0
+    assert not rgba[bin_pixels:-bin_pixels, bin_pixels:-bin_pixels, 3].any()  # transparent
@@ -0,0 +1,47 @@
+"""
+`GridIndex.query` against the strict comparison scan it replaces.
+"""
+import numpy as np
+import pytest
+
+from spatial_index import GridIndex
+
+
+def scan_rows(lat, lon, bounds):
+    """The rows strictly inside the bounds, compared in float64."""
+    (y_ll, x_ll), (y_ur, x_ur) = bounds
+    lat, lon = lat.astype(np.float64), lon.astype(np.float64)
+    return np.flatnonzero((lat > y_ll) & (lat < y_ur) & (lon > x_ll) & (lon < x_ur))
+
+
+def random_bounds(lat, lon, rng, n):
+    """Viewports of every size around the points, some with an edge on a point."""
+    valid = np.flatnonzero(np.isfinite(lat) & np.isfinite(lon))
+    bounds = []
+    for _ in range(n):
+        center = rng.choice(valid)
+        half = 10 ** rng.uniform(-3, 0.5)
+        y, x = float(lat[center]), float(lon[center])
+        bounds.append([[y - half, x - half], [y + half * rng.uniform(0.5, 2), x + half * rng.uniform(0.5, 2)]])
+        # Each edge through a point, which is then outside
+        bounds += [[[y, x - half], [y + half, x + half]], [[y - half, x], [y + half, x + half]],
+                   [[y - half, x - half], [y, x + half]], [[y - half, x - half], [y + half, x]]]
+    return bounds
+
+
+@pytest.mark.parametrize('dtype', [np.float64, np.float32])
+def test_query_matches_scan(accidents, dtype):
+    lat, lon = accidents['lat'].to_numpy(dtype), accidents['lon'].to_numpy(dtype)
+    index = GridIndex(lat, lon)
+    rng = np.random.default_rng(0)
+    for bounds in random_bounds(lat, lon, rng, 200):
+        np.testing.assert_array_equal(index.query(bounds), scan_rows(lat, lon, bounds), err_msg=str(bounds))
+
+
+def test_query_edge_cases(accidents):
+    lat, lon = accidents['lat'].to_numpy(), accidents['lon'].to_numpy()
+    index = GridIndex(lat, lon)
+    world = [[-90, -180], [90, 180]]
+    np.testing.assert_array_equal(index.query(world), np.flatnonzero(np.isfinite(lat) & np.isfinite(lon)))
+    assert len(index.query([[0, 0], [1, 1]])) == 0
+    assert len(GridIndex(np.array([np.nan]), np.array([np.nan])).query(world)) == 0
@@ -0,0 +1,81 @@
+"""
+Round trip of `VectorTiles`: a tile decoded back against the table.
+"""
+import math
+
+import numpy as np
+
+from protobuf import field_values, read_fields, read_packed, unzigzag
+from vector_tiles import VectorTiles
+
+PROPERTIES = ['HODESH_TEUNA', 'SUG_DEREH', 'HUMRAT_TEUNA']
+
+
+def decode_value(message):
+    """Decode an MVT ``Value`` message."""
+    (number, value), = read_fields(message)
+    return {1: lambda: value.decode(), 3: lambda: value, 5: lambda: value, 6: lambda: unzigzag(value),
+            7: lambda: bool(value)}[number]()
+
+
+def tile_of(lat, lon, z):
+    n = 1 << z
+    lat = math.radians(lat)
+    return int((lon + 180) / 360 * n), int((1 - math.log(math.tan(lat) + 1 / math.cos(lat)) / math.pi) / 2 * n)
+
+
+def test_tile_round_trip(accidents):
+    df = accidents
+    tiles = VectorTiles(df['lat'].values, df['lon'].values, {col: df[col].values for col in PROPERTIES},
+                        ids=df['pk_teuna_fikt'].values)
+    z = 12
+    x, y = tile_of(df['lat'][0], df['lon'][0], z)
+    rows = tiles.tile_rows(z, x, y)
+    assert len(rows)
+
+    layer, = field_values(read_fields(tiles.encode(z, x, y, rows)), 3)
+    layer = read_fields(layer)
+    assert field_values(layer, 1) == [b'accidents']
+    assert field_values(layer, 15) == [2]
+    extent, = field_values(layer, 5)
+    assert extent == 4096
+    keys = [key.decode() for key in field_values(layer, 3)]
+    values = [decode_value(value) for value in field_values(layer, 4)]
+    features = [read_fields(feature) for feature in field_values(layer, 2)]
+    assert len(features) == len(rows)
+
+    # One tile-local unit, in degrees of longitude; a degree of latitude is longer here
+    unit = 360 / ((1 << z) * extent)
+    for row, expected, feature in zip(rows.tolist(), df[PROPERTIES].iloc[rows].to_dict('records'), features):
+        assert field_values(feature, 1) == [df['pk_teuna_fikt'][row]]
+        assert field_values(feature, 3) == [1]  # POINT
+        tags, = field_values(feature, 2)
+        tags = read_packed(tags)
+        assert {keys[key]: values[value] for key, value in zip(tags[::2], tags[1::2])} == expected
+        geometry, = field_values(feature, 4)
+        command, px, py = read_packed(geometry)
+        assert command == 9  # MoveTo, one point
+        world_x = (x + (unzigzag(px) + 0.5) / extent) / (1 << z)
+        world_y = (y + (unzigzag(py) + 0.5) / extent) / (1 << z)
+        lon = world_x * 360 - 180
+        lat = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * world_y))))
+        assert abs(lon - df['lon'][row]) <= unit
+        assert abs(lat - df['lat'][row]) <= unit
+
+
+def test_tile_rows_match_a_scan(accidents):
+    df = accidents
+    tiles = VectorTiles(df['lat'].values, df['lon'].values, {})
+    z = 10
+    x, y = tile_of(df['lat'][0], df['lon'][0], z)
+    margin = tiles.buffer / tiles.extent
+    local_x = tiles.x * (1 << z) - x
+    local_y = tiles.y * (1 << z) - y
+    expected = np.flatnonzero((local_x >= -margin) & (local_x < 1 + margin) &
+                              (local_y >= -margin) & (local_y < 1 + margin))
+    np.testing.assert_array_equal(tiles.tile_rows(z, x, y), expected)
+
+
+def test_empty_tile(accidents):
+    tiles = VectorTiles(accidents['lat'].values, accidents['lon'].values, {})
+    assert tiles.encode(12, 0, 0, tiles.tile_rows(12, 0, 0)) == b''
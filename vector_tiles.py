@@ -0,0 +1,226 @@
+"""
+Mapbox vector tiles (MVT) of point features.
+
+Points are projected to Web Mercator once at startup and sorted by the Morton
+code (Z-order) of their world position, so the points of any tile ``z/x/y``
+are a contiguous range of the sorted order, found with two binary searches.
+A tile is then encoded as one ``Layer`` of POINT features: the tags of every
+point are encoded once, and only the tile-local geometry is encoded per
+request.
+
+Only the parts of the MVT 2.1 protobuf schema needed for points are written,
+with the varint helpers of `geobuf_encoder`, so there is no dependency on the
+protobuf or mapbox-vector-tile packages.
+"""
+import struct
+
+import numpy as np
+import pandas as pd
+
+from geobuf_encoder import length_delimited, varint, zigzag
+
+# Bits of the quantized world position per axis; tiles deeper than this
+# zoom level are not indexed.
+MAX_ZOOM = 31
+MAX_LATITUDE = 85.0511287798066  # Web Mercator limit
+
+# Field tags: (field number << 3) | wire type
+TILE_LAYER = 0x1a  # Tile.layers = 3, length-delimited
+LAYER_NAME = 0x0a  # Layer.name = 1, length-delimited
+LAYER_FEATURE = 0x12  # Layer.features = 2, length-delimited
+LAYER_KEY = 0x1a  # Layer.keys = 3, length-delimited
+LAYER_VALUE = 0x22  # Layer.values = 4, length-delimited
+LAYER_EXTENT = 0x28  # Layer.extent = 5, varint
+LAYER_VERSION = b'\x78\x02'  # Layer.version = 15, version 2
+FEATURE_ID = 0x08  # Feature.id = 1, varint
+FEATURE_TAGS = 0x12  # Feature.tags = 2, packed varints
+FEATURE_TYPE_POINT = b'\x18\x01'  # Feature.type = 3, POINT = 1
+FEATURE_GEOMETRY = 0x22  # Feature.geometry = 4, packed varints
+MOVE_TO_ONE = 9  # MoveTo command (1) with a count of 1
+VALUE_STRING = 0x0a  # Value.string_value = 1
+VALUE_DOUBLE = 0x19  # Value.double_value = 3, 64-bit
+VALUE_UINT = 0x28  # Value.uint_value = 5, varint
+VALUE_SINT = 0x30  # Value.sint_value = 6, zigzag varint
+VALUE_BOOL = 0x38  # Value.bool_value = 7, varint
+
+
+def encode_value(value):
+    """
+    Encode a property value as an MVT ``Value`` message.
+
+    Parameters
+    ----------
+    value : str, int, float or bool
+        The property value.
+
+    Returns
+    -------
+    bytes
+        The message, without its field tag.
+    """
+    if isinstance(value, (bool, np.bool_)):
+        return bytes([VALUE_BOOL]) + varint(int(value))
+    if isinstance(value, (int, np.integer)):
+        value = int(value)
+        if value >= 0:
+            return bytes([VALUE_UINT]) + varint(value)
+        return bytes([VALUE_SINT]) + varint(zigzag(value))
+    if isinstance(value, (float, np.floating)):
+        return bytes([VALUE_DOUBLE]) + struct.pack('<d', value)
+    return length_delimited(VALUE_STRING, str(value).encode())
+
+
+def world_position(lat, lon):
+    """
+    Project coordinates to Web Mercator world positions.
+
+    Parameters
+    ----------
+    lat : numpy.ndarray
+        Latitudes, clipped to the Web Mercator limits.
+    lon : numpy.ndarray
+        Longitudes.
+
+    Returns
+    -------
+    x, y : numpy.ndarray
+        Positions in ``[0, 1)``, from the top left corner of the world.
+    """
+    lat = np.radians(np.clip(lat, -MAX_LATITUDE, MAX_LATITUDE))
+    x = (np.asarray(lon, dtype=np.float64) + 180) / 360
+    y = (1 - np.log(np.tan(lat) + 1 / np.cos(lat)) / np.pi) / 2
+    return np.clip(x, 0, np.nextafter(1, 0)), np.clip(y, 0, np.nextafter(1, 0))
+
+
+def spread_bits(values):
+    """Interleave zeros between the 32 low bits of `values` (uint64)."""
+    values = values.astype(np.uint64) & np.uint64(0xffffffff)
+    for shift, mask in ((16, 0x0000ffff0000ffff), (8, 0x00ff00ff00ff00ff), (4, 0x0f0f0f0f0f0f0f0f),
+                        (2, 0x3333333333333333), (1, 0x5555555555555555)):
+        values = (values | values << np.uint64(shift)) & np.uint64(mask)
+    return values
+
+
+def morton_code(x, y):
+    """Morton code of integer tile or world coordinates, x in the even bits."""
+    return spread_bits(np.asarray(x)) | spread_bits(np.asarray(y)) << np.uint64(1)
+
+
+class VectorTiles:
+    """
+    Point features indexed for MVT tile encoding.
+
+    Parameters
+    ----------
+    lat : numpy.ndarray
+        Latitude of each point, float32 or float64. Points with a missing
+        coordinate are left out.
+    lon : numpy.ndarray
+        Longitude of each point.
+    properties : dict
+        Maps a property name to a column with one value per point. Missing
+        values are left out of the feature's tags.
+    ids : numpy.ndarray, optional
+        Non-negative integer id of each point, written as the feature id.
+    layer_name : str, optional
+        Name of the tile layer.
+    extent : int, optional
+        Size of a tile in tile-local coordinates.
+    buffer : int, optional
+        Points up to this distance outside a tile, in tile-local coordinates,
+        are included, so markers crossing a tile edge are drawn whole.
+    """
+
+    def __init__(self, lat, lon, properties, ids=None, layer_name='accidents', extent=4096, buffer=64):
+        self.extent = extent
+        self.buffer = buffer
+        lat, lon = np.asarray(lat), np.asarray(lon)
+        valid_rows = np.flatnonzero(np.isfinite(lat) & np.isfinite(lon))
+        x, y = world_position(lat[valid_rows].astype(np.float64), lon[valid_rows].astype(np.float64))
+        scale = float(1 << MAX_ZOOM)
+        codes = morton_code((x * scale).astype(np.uint64), (y * scale).astype(np.uint64))
+        order = np.argsort(codes, kind='stable')
+        self.codes = codes[order]
+        self.rows = valid_rows[order]
+        self.x = np.full(len(lat), np.nan)
+        self.y = np.full(len(lat), np.nan)
+        self.x[valid_rows], self.y[valid_rows] = x, y
+
+        # Every distinct value of every property goes to the layer's value
+        # table, so the tags of a point never change and are encoded once.
+        keys, values, tag_columns = [], [], []
+        for key_index, (name, column) in enumerate(properties.items()):
+            column = pd.Categorical(column)
+            keys.append(length_delimited(LAYER_KEY, name.encode()))
+            first_value = len(values)
+            values += [length_delimited(LAYER_VALUE, encode_value(value)) for value in column.categories.tolist()]
+            lookup = [varint(key_index) + varint(first_value + code) for code in range(len(column.categories))]
+            tag_columns.append(np.array(lookup + [b''], dtype=object)[column.codes])
+        tags = [length_delimited(FEATURE_TAGS, b''.join(parts)) for parts in zip(*tag_columns)] \
+            if tag_columns else [length_delimited(FEATURE_TAGS, b'')] * len(lat)
+        if ids is not None:
+            tags = [bytes([FEATURE_ID]) + varint(feature_id) + feature_tags
+                    for feature_id, feature_tags in zip(np.asarray(ids).tolist(), tags)]
+        self.tags = np.array(tags, dtype=object)
+        self.layer_head = length_delimited(LAYER_NAME, layer_name.encode())
+        self.layer_tail = b''.join(keys + values) + bytes([LAYER_EXTENT]) + varint(extent) + LAYER_VERSION
+
+    def _tile_range(self, z, x, y):
+        """Start and stop of the points of tile ``z/x/y`` in the sorted order."""
+        shift = np.uint64(2 * (MAX_ZOOM - z))
+        first = morton_code(x, y) << shift
+        last = first + (np.uint64(1) << shift)
+        return np.searchsorted(self.codes, first), np.searchsorted(self.codes, last)
+
+    def tile_rows(self, z, x, y):
+        """
+        Return the points of a tile, including its buffer.
+
+        Parameters
+        ----------
+        z, x, y : int
+            The tile coordinates, ``0 <= x, y < 2 ** z`` and ``z <= MAX_ZOOM``.
+
+        Returns
+        -------
+        numpy.ndarray
+            Sorted row positions.
+        """
+        n = 1 << z
+        ranges = [self._tile_range(z, tile_x, tile_y)
+                  for tile_x in range(max(x - 1, 0), min(x + 2, n))
+                  for tile_y in range(max(y - 1, 0), min(y + 2, n))]
+        rows = np.sort(np.concatenate([self.rows[start:stop] for start, stop in ranges]))
+        margin = self.buffer / self.extent
+        local_x = self.x[rows] * n - x
+        local_y = self.y[rows] * n - y
+        keep = (local_x >= -margin) & (local_x < 1 + margin) & (local_y >= -margin) & (local_y < 1 + margin)
+        return rows[keep]
+
+    def encode(self, z, x, y, rows):
+        """
+        Encode the points of a tile.
+
+        Parameters
+        ----------
+        z, x, y : int
+            The tile coordinates.
+        rows : numpy.ndarray
+            Positions of the points to encode, e.g. a subset of `tile_rows`.
+
+        Returns
+        -------
+        bytes
+            The encoded ``Tile`` message, empty when there is no point.
+        """
+        if not len(rows):
+            return b''
+        n = 1 << z
+        local_x = np.floor((self.x[rows] * n - x) * self.extent).astype(np.int64)
+        local_y = np.floor((self.y[rows] * n - y) * self.extent).astype(np.int64)
+        features = [
+            length_delimited(LAYER_FEATURE, tags + FEATURE_TYPE_POINT + length_delimited(
+                FEATURE_GEOMETRY, bytes([MOVE_TO_ONE]) + varint(zigzag(px)) + varint(zigzag(py))))
+            for tags, px, py in zip(self.tags[rows].tolist(), local_x.tolist(), local_y.tolist())
+        ]
+        return length_delimited(TILE_LAYER, b''.join([self.layer_head, *features, self.layer_tail]))